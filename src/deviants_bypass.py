@@ -1,3 +1,5 @@
+import asyncio
+import functools
 import html
 import json
 import re
@@ -11,16 +13,81 @@ USER_AGENT = (
     "AppleWebKit/537.36 (KHTML, like Gecko) "
     "Chrome/131.0.0.0 Safari/537.36"
 )
+RESOLVE_CONCURRENCY = 4
+
+_VIDEO_ID_PART_RE = re.compile(r"^(\d{4,})_")
+_LICENSE_CODE_RE = re.compile(r"license_code:\s*'([^']+)'")
+_KVS_VIDEO_URL_RE = re.compile(r"video_(?:url|alt_url\d*):\s*'([^']+)'")
+_JSON_URL_KEYS = (
+    "videoUrl",
+    "video_url",
+    "playback_url",
+    "file",
+    "src",
+    "url",
+    "hls",
+    "hlsUrl",
+    "stream_url",
+)
+# Searched on their own, in priority order, so a title never consumes the links in it.
+_TITLE_RES = (
+    re.compile(r'<meta[^>]+property="og:title"[^>]+content="([^"]+)"', re.I | re.S),
+    re.compile(r"<title>(.*?)</title>", re.I | re.S),
+)
+# (group name, pattern); the literal prefix of each alternative lets the regex
+# engine skip ahead, so no separate marker pre-scan is needed.
+_CANDIDATE_PATTERNS = (
+    (
+        "og",
+        r'<meta[^>]+property="og:video(?::secure_url)?"[^>]+content="(?P<og>[^"]+)"',
+    ),
+    ("source", r'<source[^>]+src="(?P<source>[^"]+\.(?:m3u8|mp4)[^"]*)"'),
+    (
+        "json",
+        r'"(?:%s)"\s*:\s*"(?P<json>[^"]+)"' % "|".join(_JSON_URL_KEYS),
+    ),
+    ("http", r"(?P<http>https?://[^\s\"'<>]+?\.(?:m3u8|mp4)[^\s\"'<>]*)"),
+)
+# Bare links often sit inside the values the other alternatives capture, so
+# they get their own pass instead of competing with them for the same text.
+_SEPARATE_PATTERNS = ("http",)
+_SEPARATE_RES = {
+    name: re.compile(pattern, re.I)
+    for name, pattern in _CANDIDATE_PATTERNS
+    if name in _SEPARATE_PATTERNS
+}
+# Stays on the stdlib engine: the alternation has no nested quantifiers, so it scans
+# linearly, and google-re2's per-match overhead made it several times slower here.
+_PAGE_RE = re.compile(
+    "|".join(
+        pattern for name, pattern in _CANDIDATE_PATTERNS if name not in _SEPARATE_PATTERNS
+    ),
+    re.I,
+)
+_VIDEO_EXT_RE = re.compile(r"\.(mp4|m3u8|mov|webm)(?:/?$)", re.I)
+_IMAGE_EXT_RE = re.compile(r"\.(jpg|jpeg|png|webp)(?:/?$)", re.I)
+_MP4_RE = re.compile(r"\.mp4(?:/?$)", re.I)
+_JPG_END_RE = re.compile(r"\.jpg$", re.I)
+_GET_FILE_RE = re.compile(r"/get_file/", re.I)
+_PREVIEW_RE = re.compile(r"preview", re.I)
+_DEVIANTS_HOST_RE = re.compile(r"deviants\.com", re.I)
+_QUALITY_RE = re.compile(r"(\d{3,4})p", re.I)
+_BR_RE = re.compile(r"(?:^|&)br=(\d+)(?:&|$)")
+_RS_RE = re.compile(r"(?:^|&)rs=(\d+)k(?:&|$)")
+
+
+@functools.lru_cache(maxsize=1024)
+def _urlparse(url: str) -> urllib.parse.ParseResult:
+    return urllib.parse.urlparse(url)
 
 
-def fetch_page(url: str, session: requests.Session | None = None) -> tuple[int, str]:
+async def fetch_page(url: str, session: requests.AsyncSession) -> tuple[int, str]:
     headers = {
         "User-Agent": USER_AGENT,
         "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
         "Accept-Language": "en-US,en;q=0.9",
     }
-    client = session if session is not None else requests
-    response = client.get(
+    response = await session.get(
         url,
         impersonate="chrome120",
         headers=headers,
@@ -30,24 +97,18 @@ def fetch_page(url: str, session: requests.Session | None = None) -> tuple[int,
     return response.status_code, response.text
 
 
-def extract_title(page: str) -> str | None:
-    for pattern in [
-        r'<meta[^>]+property="og:title"[^>]+content="([^"]+)"',
-        r"<title>(.*?)</title>",
-    ]:
-        match = re.search(pattern, page, re.I | re.S)
-        if match:
-            return html.unescape(match.group(1)).strip()
-    return None
-
-
 def normalize_url(value: str) -> str:
-    return html.unescape(value.replace("\\/", "/").replace("\\u0026", "&")).strip()
+    # Most URLs carry neither JSON escapes nor entities; skip both passes for them.
+    if "\\" in value:
+        value = value.replace("\\/", "/").replace("\\u0026", "&")
+    if "&" in value:
+        value = html.unescape(value)
+    return value.strip()
 
 
 def canonical_deviants_page_url(url: str) -> str:
     try:
-        parsed = urllib.parse.urlparse(url)
+        parsed = _urlparse(url)
     except Exception:
         return url
     path = parsed.path or ""
@@ -63,7 +124,7 @@ def canonical_deviants_page_url(url: str) -> str:
             if part.isdigit() and len(part) >= 4:
                 video_id = part
                 break
-            match = re.match(r"^(\d{4,})_", part)
+            match = _VIDEO_ID_PART_RE.match(part)
             if match:
                 video_id = match.group(1)
                 break
@@ -72,19 +133,32 @@ def canonical_deviants_page_url(url: str) -> str:
     return f"{parsed.scheme or 'https'}://{parsed.netloc or 'www.deviants.com'}/videos/{video_id}/"
 
 
-def kvs_get_license_token(license_code: str) -> list[int]:
+@functools.lru_cache(maxsize=16)
+def kvs_get_license_token(license_code: str) -> tuple[int, ...]:
     code = license_code.replace("$", "")
-    license_values = [int(char) for char in code]
+    license_values = list(map(int, code))
     modlicense = code.replace("0", "1")
     center = len(modlicense) // 2
     fronthalf = int(modlicense[: center + 1])
     backhalf = int(modlicense[center:])
     modlicense = str(4 * abs(fronthalf - backhalf))[: center + 1]
-    return [
+    return tuple(
         (license_values[index + offset] + current) % 10
         for index, current in enumerate(map(int, modlicense))
         for offset in range(4)
-    ]
+    )
+
+
+@functools.lru_cache(maxsize=16)
+def kvs_get_hash_permutation(license_code: str, hash_len: int = 32) -> tuple[int, ...]:
+    license_token = kvs_get_license_token(license_code)
+    indices = list(range(hash_len))
+    accum = 0
+    for src in reversed(range(hash_len)):
+        accum += license_token[src]
+        dest = (src + accum) % hash_len
+        indices[src], indices[dest] = indices[dest], indices[src]
+    return tuple(indices)
 
 
 def kvs_get_real_url(video_url: str, license_code: str) -> str:
@@ -92,32 +166,26 @@ def kvs_get_real_url(video_url: str, license_code: str) -> str:
         return video_url
 
     parsed = urllib.parse.urlparse(video_url[len("function/0/") :])
-    license_token = kvs_get_license_token(license_code)
     urlparts = parsed.path.split("/")
     if len(urlparts) < 4:
         return video_url[len("function/0/") :]
 
     hash_len = 32
     hash_part = urlparts[3][:hash_len]
-    indices = list(range(hash_len))
-    accum = 0
-    for src in reversed(range(hash_len)):
-        accum += license_token[src]
-        dest = (src + accum) % hash_len
-        indices[src], indices[dest] = indices[dest], indices[src]
-    urlparts[3] = "".join(hash_part[index] for index in indices) + urlparts[3][hash_len:]
+    indices = kvs_get_hash_permutation(license_code, hash_len)
+    urlparts[3] = "".join(map(hash_part.__getitem__, indices)) + urlparts[3][hash_len:]
     return urllib.parse.urlunparse(parsed._replace(path="/".join(urlparts)))
 
 
 def extract_kvs_video_urls(page: str) -> list[str]:
-    license_match = re.search(r"license_code:\s*'([^']+)'", page)
+    license_match = _LICENSE_CODE_RE.search(page)
     if not license_match:
         return []
     license_code = license_match.group(1).strip()
     if not license_code:
         return []
 
-    raw_urls = re.findall(r"video_(?:url|alt_url\d*):\s*'([^']+)'", page)
+    raw_urls = _KVS_VIDEO_URL_RE.findall(page)
     urls: list[str] = []
     for raw in raw_urls:
         value = normalize_url(raw)
@@ -130,18 +198,30 @@ def extract_kvs_video_urls(page: str) -> list[str]:
     return urls
 
 
+def _scan_candidates(page: str) -> dict[str, list[str]]:
+    # Bucket matches by group so the caller keeps the per-pattern priority order.
+    found: dict[str, list[str]] = {name: [] for name, _ in _CANDIDATE_PATTERNS}
+    for match in _PAGE_RE.finditer(page):
+        found[match.lastgroup].append(match.group(match.lastgroup))
+    for name, separate_re in _SEPARATE_RES.items():
+        found[name] = separate_re.findall(page)
+    return found
+
+
+def extract_title(page: str) -> str | None:
+    for title_re in _TITLE_RES:
+        match = title_re.search(page)
+        if match:
+            return html.unescape(match.group(1)).strip()
+    return None
+
+
 def extract_candidates(page: str) -> list[str]:
     candidates: list[str] = extract_kvs_video_urls(page)
-    patterns = [
-        r'<meta[^>]+property="og:video(?::secure_url)?"[^>]+content="([^"]+)"',
-        r'<source[^>]+src="([^"]+\.(?:m3u8|mp4)[^"]*)"',
-        r'"(?:videoUrl|video_url|playback_url|file|src|url|hls|hlsUrl|stream_url)"\s*:\s*"([^"]+)"',
-        r"(https?://[^\s\"'<>]+?\.(?:m3u8|mp4)[^\s\"'<>]*)",
-    ]
-
-    for pattern in patterns:
-        for match in re.findall(pattern, page, re.I):
-            url = normalize_url(match)
+    found = _scan_candidates(page)
+    for name, _ in _CANDIDATE_PATTERNS:
+        for raw in found[name]:
+            url = normalize_url(raw)
             if not url.startswith("http"):
                 continue
             candidates.append(url)
@@ -156,19 +236,25 @@ def extract_candidates(page: str) -> list[str]:
     return deduped
 
 
-def resolve_get_file_url(session: requests.Session, referer: str, url: str) -> str | None:
+async def resolve_get_file_url(
+    session: requests.AsyncSession, referer: str, url: str
+) -> str | None:
+    request_kwargs = {
+        "headers": {
+            "User-Agent": USER_AGENT,
+            "Accept": "*/*",
+            "Referer": referer,
+        },
+        "impersonate": "chrome120",
+        "timeout": 10,
+        "allow_redirects": True,
+    }
     try:
-        response = session.get(
-            url,
-            headers={
-                "User-Agent": USER_AGENT,
-                "Accept": "*/*",
-                "Referer": referer,
-            },
-            impersonate="chrome120",
-            timeout=10,
-            allow_redirects=True,
-        )
+        # Only the final URL and headers matter, so avoid pulling video bytes.
+        response = await session.head(url, **request_kwargs)
+        if response.status_code in (405, 501):
+            response = await session.get(url, stream=True, **request_kwargs)
+            await response.aclose()
         status = response.status_code
         final_url = str(response.url or "").strip()
         content_type = (response.headers.get("content-type") or "").lower()
@@ -182,34 +268,26 @@ def resolve_get_file_url(session: requests.Session, referer: str, url: str) -> s
 
 
 def score_url(url: str) -> tuple[int, int, int, int, int, int, int]:
-    lower = url.lower()
-    parsed = urllib.parse.urlparse(url)
-    path = (parsed.path or "").lower()
-    query = urllib.parse.parse_qs(parsed.query)
+    parsed = _urlparse(url)
+    path = parsed.path or ""
 
+    # Case-insensitive patterns on the original strings; no lowercased copies.
     # Prefer actual video URLs and avoid preview images.
-    is_video = 1 if ("/get_file/" in path or re.search(r"\.(mp4|m3u8|mov|webm)(?:/?$)", path)) else 0
-    is_image = 1 if re.search(r"\.(jpg|jpeg|png|webp)(?:/?$)", path) else 0
+    is_get_file = 1 if _GET_FILE_RE.search(path) else 0
+    is_video = 1 if (is_get_file or _VIDEO_EXT_RE.search(path)) else 0
+    is_image = 1 if _IMAGE_EXT_RE.search(path) else 0
     is_mjedge = 1 if parsed.hostname and parsed.hostname.endswith("mjedge.net") else 0
-    direct_mp4 = 1 if re.search(r"\.mp4(?:/?$)", path) else 0
-    is_get_file = 1 if "/get_file/" in path else 0
-    is_preview = 1 if "preview" in path or path.endswith(".jpg") else 0
-    preferred_host = 1 if "deviants.com" in lower else 0
+    direct_mp4 = 1 if _MP4_RE.search(path) else 0
+    is_preview = 1 if _PREVIEW_RE.search(path) or _JPG_END_RE.search(path) else 0
+    preferred_host = 1 if _DEVIANTS_HOST_RE.search(url) else 0
 
     br = 10**9
-    try:
-        br_raw = query.get("br", [None])[0]
-        if br_raw:
-            br = int(br_raw)
-        else:
-            rs_raw = query.get("rs", [None])[0]
-            if rs_raw and rs_raw.endswith("k"):
-                br = int(rs_raw[:-1])
-    except Exception:
-        br = 10**9
+    bitrate_match = _BR_RE.search(parsed.query) or _RS_RE.search(parsed.query)
+    if bitrate_match:
+        br = int(bitrate_match.group(1))
 
     quality = 0
-    quality_match = re.search(r"(\d{3,4})p", lower)
+    quality_match = _QUALITY_RE.search(url)
     if quality_match:
         quality = int(quality_match.group(1))
 
@@ -228,10 +306,52 @@ def score_url(url: str) -> tuple[int, int, int, int, int, int, int]:
 def pick_best(candidates: list[str]) -> str | None:
     if not candidates:
         return None
-    return max(candidates, key=score_url)
+    # Score each distinct URL once (resolved get_file URLs often repeat);
+    # the negated index keeps the earliest candidate on ties.
+    first_index: dict[str, int] = {}
+    for index, url in enumerate(candidates):
+        first_index.setdefault(url, index)
+    scored = [(score_url(url), -index, url) for url, index in first_index.items()]
+    return max(scored)[2]
+
+
+def _pre_score(url: str) -> tuple[int, int, int]:
+    score = score_url(url)
+    quality_match = _QUALITY_RE.search(url)
+    return (score[3], score[4], int(quality_match.group(1)) if quality_match else 0)
+
+
+async def resolve_get_file_urls(
+    session: requests.AsyncSession, referer: str, urls: list[str]
+) -> dict[str, str]:
+    # Probe the most promising URLs first, a few at a time, and stop as soon as
+    # one resolves to a real video: nothing later can beat it on the leading
+    # (is_video, not image, not preview) part of score_url.
+    semaphore = asyncio.Semaphore(RESOLVE_CONCURRENCY)
+
+    async def resolve(url: str) -> str | None:
+        async with semaphore:
+            return await resolve_get_file_url(session, referer, url)
+
+    ordered = sorted(urls, key=_pre_score, reverse=True)
+    tasks = [asyncio.ensure_future(resolve(url)) for url in ordered]
+    resolved_urls: dict[str, str] = {}
+    try:
+        for url, task in zip(ordered, tasks):
+            resolved = await task
+            if not resolved:
+                continue
+            resolved_urls[url] = resolved
+            if score_url(resolved)[:3] == (1, 1, 1):
+                break
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    return resolved_urls
 
 
-def main():
+async def main():
     if len(sys.argv) < 2:
         print(json.dumps({"error": "No URL provided"}))
         return
@@ -239,24 +359,29 @@ def main():
     url = sys.argv[1]
     page_url = canonical_deviants_page_url(url)
     try:
-        session = requests.Session()
-        status, page = fetch_page(page_url, session)
-        if status >= 400:
-            print(json.dumps({"error": f"HTTP {status}"}))
-            return
-
-        if "cf-mitigated" in page or "Just a moment..." in page:
-            print(json.dumps({"error": "Cloudflare challenge"}))
-            return
+        async with requests.AsyncSession() as session:
+            status, page = await fetch_page(page_url, session)
+            if status >= 400:
+                print(json.dumps({"error": f"HTTP {status}"}))
+                return
+
+            if "cf-mitigated" in page or "Just a moment..." in page:
+                print(json.dumps({"error": "Cloudflare challenge"}))
+                return
+
+            title = extract_title(page)
+            raw_candidates = extract_candidates(page)
+            resolved_urls = await resolve_get_file_urls(
+                session,
+                page_url,
+                [candidate for candidate in raw_candidates if "/get_file/" in candidate],
+            )
 
-        title = extract_title(page)
-        raw_candidates = extract_candidates(page)
         candidates: list[str] = []
         for candidate in raw_candidates:
-            if "/get_file/" in candidate:
-                resolved = resolve_get_file_url(session, page_url, candidate)
-                if resolved:
-                    candidates.append(resolved)
+            resolved = resolved_urls.get(candidate)
+            if resolved:
+                candidates.append(resolved)
             candidates.append(candidate)
         best = pick_best(candidates)
         if not best:
@@ -269,4 +394,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
@@ -1,6 +1,6 @@
 import os
-import subprocess
 import sys
+import time
 
 from curl_cffi import requests
 
@@ -15,6 +15,14 @@ CONNECT_TIMEOUT = 20
 READ_TIMEOUT = 60
 MAX_TOTAL_SECONDS = 180
 MIN_VALID_BYTES = 1024
+WRITE_BUFFER_BYTES = 4 * 1024 * 1024
+RETRIES = 3
+RETRY_DELAY_SECONDS = 2
+
+# One client for the warm-up and the impersonated download, so the download keeps
+# the referer cookies and the already-negotiated HTTP/2 connection to the host.
+_SESSION_OPTIONS = {"http_version": "v2"}
+_SESSION = requests.Session(**_SESSION_OPTIONS)
 
 
 def _safe_remove(path: str) -> None:
@@ -24,37 +32,6 @@ def _safe_remove(path: str) -> None:
         pass
 
 
-def _download_with_curl(url: str, output_path: str, referer: str) -> None:
-    cmd = [
-        "curl",
-        "--fail",
-        "--silent",
-        "--show-error",
-        "--location",
-        "--retry",
-        "3",
-        "--retry-delay",
-        "2",
-        "--retry-all-errors",
-        "--connect-timeout",
-        str(CONNECT_TIMEOUT),
-        "--max-time",
-        str(MAX_TOTAL_SECONDS),
-        "--user-agent",
-        USER_AGENT,
-        "--header",
-        "Accept: */*",
-    ]
-    if referer:
-        cmd.extend(["--referer", referer])
-    cmd.extend(["--output", output_path, url])
-
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    if result.returncode != 0:
-        stderr = (result.stderr or "").strip()
-        raise RuntimeError(f"curl failed ({result.returncode}): {stderr[:500]}")
-
-
 def _download_with_curl_cffi(url: str, output_path: str, referer: str) -> None:
     headers = {
         "User-Agent": USER_AGENT,
@@ -63,10 +40,9 @@ def _download_with_curl_cffi(url: str, output_path: str, referer: str) -> None:
     if referer:
         headers["Referer"] = referer
 
-    session = requests.Session()
     if referer:
         try:
-            session.get(
+            _SESSION.get(
                 referer,
                 headers={
                     "User-Agent": USER_AGENT,
@@ -78,20 +54,74 @@ def _download_with_curl_cffi(url: str, output_path: str, referer: str) -> None:
         except Exception:
             pass
 
+    deadline = time.monotonic() + MAX_TOTAL_SECONDS
+    _stream_to_file(_SESSION, url, output_path, headers, deadline, impersonate="chrome120")
+
+
+def _download_with_retries(url: str, output_path: str, referer: str) -> None:
+    # Plain (non-impersonated) requests with curl-style retries, kept in-process so
+    # every attempt reuses the same connection pool. It gets a fresh client rather
+    # than the impersonated one, whose state may be what made that attempt fail.
+    headers = {
+        "User-Agent": USER_AGENT,
+        "Accept": "*/*",
+    }
+    if referer:
+        headers["Referer"] = referer
+
+    deadline = time.monotonic() + MAX_TOTAL_SECONDS
+    last_error: Exception | None = None
+    attempts = 0
+    with requests.Session(**_SESSION_OPTIONS) as session:
+        for attempt in range(RETRIES + 1):
+            if attempt:
+                time.sleep(RETRY_DELAY_SECONDS)
+            if time.monotonic() >= deadline:
+                break
+            _safe_remove(output_path)
+            attempts += 1
+            try:
+                _stream_to_file(session, url, output_path, headers, deadline)
+                return
+            except Exception as exc:
+                last_error = exc
+    # Only ever run after the impersonated download failed, which counts too
+    raise RuntimeError(
+        f"failed after {attempts + 1} attempts "
+        f"(1 impersonated, {attempts} plain): {last_error}"
+    )
+
+
+def _stream_to_file(
+    session: requests.Session,
+    url: str,
+    output_path: str,
+    headers: dict[str, str],
+    deadline: float,
+    impersonate: str | None = None,
+) -> None:
     response = session.get(
         url,
         headers=headers,
-        impersonate="chrome120",
+        impersonate=impersonate,
         stream=True,
         timeout=(CONNECT_TIMEOUT, READ_TIMEOUT),
     )
-    if response.status_code >= 400:
-        raise RuntimeError(f"HTTP {response.status_code}")
-
-    with open(output_path, "wb") as file:
-        for chunk in response.iter_content(chunk_size=1024 * 256):
-            if chunk:
-                file.write(chunk)
+    try:
+        if response.status_code >= 400:
+            raise RuntimeError(f"HTTP {response.status_code}")
+
+        # curl hands over small chunks regardless of chunk_size; a large file buffer
+        # coalesces them into few write() calls.
+        with open(output_path, "wb", buffering=WRITE_BUFFER_BYTES) as file:
+            for chunk in response.iter_content():
+                if chunk:
+                    file.write(chunk)
+                # READ_TIMEOUT only bounds stalls; a slow trickle is cut off here.
+                if time.monotonic() >= deadline:
+                    raise RuntimeError(f"exceeded {MAX_TOTAL_SECONDS}s total")
+    finally:
+        response.close()
 
 
 def main() -> int:
@@ -108,7 +138,7 @@ def main() -> int:
         os.makedirs(parent, exist_ok=True)
 
     errors = []
-    for downloader in (_download_with_curl, _download_with_curl_cffi):
+    for downloader in (_download_with_curl_cffi, _download_with_retries):
         _safe_remove(output_path)
         try:
             downloader(url, output_path, referer)
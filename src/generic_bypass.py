@@ -1,9 +1,15 @@
+import functools
 import html
 import json
 import re
 import sys
 from urllib.parse import urljoin, urlparse
 
+try:
+    from selectolax.lexbor import LexborHTMLParser as HTMLParser  # type: ignore
+except ImportError:
+    HTMLParser = None
+
 
 USER_AGENT = (
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
@@ -11,6 +17,81 @@ USER_AGENT = (
     "Chrome/131.0.0.0 Safari/537.36"
 )
 
+_TITLE_PATTERNS = [
+    re.compile(p, re.I | re.S)
+    for p in (
+        r'<meta[^>]+property="og:title"[^>]+content="([^"]+)"',
+        r'<meta[^>]+name="twitter:title"[^>]+content="([^"]+)"',
+        r"<title>(.*?)</title>",
+    )
+]
+_JSON_URL_KEYS = (
+    "videoUrl",
+    "video_url",
+    "playback_url",
+    "stream_url",
+    "hlsUrl",
+    "hls_url",
+    "dash_url",
+    "file",
+    "src",
+    "url",
+)
+# (group name, pattern); the literal prefix of each alternative lets the regex
+# engine skip ahead, so no separate marker pre-scan is needed.
+_CANDIDATE_PATTERNS = (
+    (
+        "og",
+        r'<meta[^>]+property="og:video(?::secure_url)?"[^>]+content="(?P<og>[^"]+)"',
+    ),
+    (
+        "twitter",
+        r'<meta[^>]+name="twitter:player:stream"[^>]+content="(?P<twitter>[^"]+)"',
+    ),
+    ("source", r'<source[^>]+src="(?P<source>[^"]+)"'),
+    ("video", r'<video[^>]+src="(?P<video>[^"]+)"'),
+    ("iframe", r'<iframe[^>]+src="(?P<iframe>[^"]+)"'),
+    (
+        "json",
+        r'"(?:%s)"\s*:\s*"(?P<json>[^"]+)"' % "|".join(_JSON_URL_KEYS),
+    ),
+    ("http", r"(?P<http>https?://[^\s\"'<>]+)"),
+)
+# Bare links often sit inside the values the other alternatives capture, so
+# they get their own pass instead of competing with them for the same text.
+_SEPARATE_PATTERNS = ("http",)
+_SEPARATE_RES = {
+    name: re.compile(pattern, re.I)
+    for name, pattern in _CANDIDATE_PATTERNS
+    if name in _SEPARATE_PATTERNS
+}
+# (group name, CSS selector, attribute) read straight from the DOM when selectolax is available;
+# these replace the matching tag alternatives above.
+_TAG_CANDIDATES = (
+    ("og", 'meta[property="og:video"], meta[property="og:video:secure_url"]', "content"),
+    ("twitter", 'meta[name="twitter:player:stream"]', "content"),
+    ("source", "source[src]", "src"),
+    ("video", "video[src]", "src"),
+    ("iframe", "iframe[src]", "src"),
+)
+_BLOCKED_TOKEN_RE = re.compile(
+    "|".join(
+        re.escape(token)
+        for token in (
+            "doubleclick.net",
+            "googlesyndication.com",
+            "google-analytics.com",
+            "adservice.",
+            "/ads/",
+            ".vtt",
+            ".srt",
+        )
+    ),
+    re.I,
+)
+_MEDIA_EXT_RE = re.compile(r"\.(?:mp4|m3u8|mpd|webm|mov)", re.I)
+_QUALITY_RE = re.compile(r"(\d{3,4})p", re.I)
+
 
 def fetch_html(url: str) -> tuple[int, str]:
     headers = {
@@ -41,25 +122,20 @@ def fetch_html(url: str) -> tuple[int, str]:
 
 
 def extract_title(page: str) -> str | None:
-    for pattern in [
-        r'<meta[^>]+property="og:title"[^>]+content="([^"]+)"',
-        r'<meta[^>]+name="twitter:title"[^>]+content="([^"]+)"',
-        r"<title>(.*?)</title>",
-    ]:
-        match = re.search(pattern, page, re.I | re.S)
+    for pattern in _TITLE_PATTERNS:
+        match = pattern.search(page)
         if match:
             return html.unescape(match.group(1)).strip()
     return None
 
 
 def normalize_candidate(raw: str, base_url: str) -> str | None:
-    value = (
-        raw.replace("\\/", "/")
-        .replace("\\u0026", "&")
-        .replace("\\u003D", "=")
-        .replace("&amp;", "&")
-    )
-    value = html.unescape(value).strip()
+    value = raw
+    if "\\" in value:
+        value = value.replace("\\/", "/").replace("\\u0026", "&").replace("\\u003D", "=")
+    if "&" in value:
+        value = html.unescape(value.replace("&amp;", "&"))
+    value = value.strip()
     if not value:
         return None
 
@@ -71,40 +147,47 @@ def normalize_candidate(raw: str, base_url: str) -> str | None:
     if not value.startswith("http://") and not value.startswith("https://"):
         return None
 
-    lowered = value.lower()
-    if any(
-        token in lowered
-        for token in [
-            "doubleclick.net",
-            "googlesyndication.com",
-            "google-analytics.com",
-            "adservice.",
-            "/ads/",
-            ".vtt",
-            ".srt",
-        ]
-    ):
+    if _BLOCKED_TOKEN_RE.search(value):
         return None
 
     return value
 
 
+@functools.lru_cache(maxsize=None)
+def _compile_candidate_re(names: tuple[str, ...]) -> re.Pattern[str]:
+    return re.compile(
+        "|".join(pattern for name, pattern in _CANDIDATE_PATTERNS if name in names),
+        re.I,
+    )
+
+
 def collect_candidates(page: str, base_url: str) -> list[str]:
-    candidates: list[str] = []
+    # Scan the page once; bucket matches so candidates keep the per-pattern priority order.
+    found: dict[str, list[str]] = {name: [] for name, _ in _CANDIDATE_PATTERNS}
+    exclude: tuple[str, ...] = ()
+    if HTMLParser is not None:
+        tree = HTMLParser(page)
+        for name, selector, attribute in _TAG_CANDIDATES:
+            for node in tree.css(selector):
+                value = node.attributes.get(attribute)
+                if value:
+                    found[name].append(value)
+        exclude = tuple(name for name, _, _ in _TAG_CANDIDATES)
+
+    combined = tuple(
+        name
+        for name, _ in _CANDIDATE_PATTERNS
+        if name not in exclude and name not in _SEPARATE_PATTERNS
+    )
+    for match in _compile_candidate_re(combined).finditer(page):
+        found[match.lastgroup].append(match.group(match.lastgroup))
+    for name, separate_re in _SEPARATE_RES.items():
+        found[name] = separate_re.findall(page)
 
-    patterns = [
-        r'<meta[^>]+property="og:video(?::secure_url)?"[^>]+content="([^"]+)"',
-        r'<meta[^>]+name="twitter:player:stream"[^>]+content="([^"]+)"',
-        r'<source[^>]+src="([^"]+)"',
-        r'<video[^>]+src="([^"]+)"',
-        r'<iframe[^>]+src="([^"]+)"',
-        r'"(?:videoUrl|video_url|playback_url|stream_url|hlsUrl|hls_url|dash_url|file|src|url)"\s*:\s*"([^"]+)"',
-        r"(https?://[^\s\"'<>]+)",
-    ]
-
-    for pattern in patterns:
-        for match in re.findall(pattern, page, re.I):
-            candidate = normalize_candidate(match, base_url)
+    candidates: list[str] = []
+    for name, _ in _CANDIDATE_PATTERNS:
+        for raw in found[name]:
+            candidate = normalize_candidate(raw, base_url)
             if candidate:
                 candidates.append(candidate)
 
@@ -119,18 +202,15 @@ def collect_candidates(page: str, base_url: str) -> list[str]:
 
 
 def score_candidate(url: str, source_host: str) -> tuple[int, int, int, int]:
-    lowered = url.lower()
     parsed = urlparse(url)
     host = parsed.hostname or ""
 
-    is_media_like = int(
-        any(ext in lowered for ext in [".mp4", ".m3u8", ".mpd", ".webm", ".mov"])
-    )
+    is_media_like = int(_MEDIA_EXT_RE.search(url) is not None)
     is_embed_like = int(any(tag in host for tag in ["vimeo.com", "youtube.com", "youtu.be"]))
     same_host = int(host == source_host or host.endswith(f".{source_host}"))
 
     quality = 0
-    quality_match = re.search(r"(\d{3,4})p", lowered)
+    quality_match = _QUALITY_RE.search(url)
     if quality_match:
         quality = int(quality_match.group(1))
 
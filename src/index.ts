@@ -69,7 +69,7 @@ import { translateText } from "./translate"
 import { Updater } from "./updater"
 import { chunkArray, removeHashtagsMentions, cleanUrl, cutoffWithNotice } from "./util"
 import { readJsonFile, writeFileAtomic } from "./file-util"
-import { execFile, spawn, type ExecFileOptions } from "node:child_process"
+import { execFile, spawn, type ChildProcess, type ExecFileOptions } from "node:child_process"
 
 const TEMP_PREFIX = "yakachokbot-"
 const AUDIO_LOUDNORM_FILTER = "loudnorm=I=-16:TP=-1.5:LRA=11"
@@ -2569,17 +2569,145 @@ const tiktokPhotoMatcher = (url: string) => {
 	}
 }
 
+// TikTok photo links are resolved by a small pool of long-lived workers, so
+// yt-dlp is imported once per worker instead of per URL. Each worker handles
+// one request at a time and echoes the request id with its reply; when every
+// worker is busy the request runs in its own process as before. Workers are
+// retired after a number of requests, when idle, and after a yt-dlp update, so
+// a fresh one picks up the current yt-dlp and starts with an empty cache.
+const TIKTOK_PHOTO_WORKERS = 2
+const TIKTOK_PHOTO_TIMEOUT_MS = 120_000
+const TIKTOK_PHOTO_MAX_REQUESTS = 200
+const TIKTOK_PHOTO_IDLE_MS = 10 * 60_000
+
+type TiktokPhotoWorker = {
+	child: ChildProcess
+	busy: boolean
+	served: number
+	idleTimer: NodeJS.Timeout | null
+	pending: Map<string, (result: unknown) => void>
+}
+
+const tiktokPhotoWorkers = new Set<TiktokPhotoWorker>()
+
+const spawnTiktokPhotoWorker = () => {
+	const child = spawn("python3", ["src/tiktok_photo_bypass.py", "--worker"], {
+		stdio: ["pipe", "pipe", "ignore"],
+	})
+	const worker: TiktokPhotoWorker = {
+		child,
+		busy: false,
+		served: 0,
+		idleTimer: null,
+		pending: new Map(),
+	}
+	let buffer = ""
+	child.stdout?.setEncoding("utf8")
+	child.stdout?.on("data", (chunk: string) => {
+		buffer += chunk
+		let newline = buffer.indexOf("\n")
+		while (newline !== -1) {
+			const line = buffer.slice(0, newline).trim()
+			buffer = buffer.slice(newline + 1)
+			newline = buffer.indexOf("\n")
+			if (!line) continue
+			let reply: { id?: unknown; result?: unknown }
+			try {
+				reply = JSON.parse(line)
+			} catch {
+				continue
+			}
+			if (typeof reply?.id !== "string") continue
+			const settle = worker.pending.get(reply.id)
+			if (!settle) continue
+			worker.pending.delete(reply.id)
+			settle(reply.result ?? null)
+		}
+	})
+	const onGone = () => {
+		if (worker.idleTimer) clearTimeout(worker.idleTimer)
+		tiktokPhotoWorkers.delete(worker)
+		const pending = [...worker.pending.values()]
+		worker.pending.clear()
+		for (const settle of pending) settle(null)
+	}
+	child.on("exit", onGone)
+	child.on("error", onGone)
+	child.stdin?.on("error", () => {})
+	tiktokPhotoWorkers.add(worker)
+	return worker
+}
+
+// Closing stdin lets the worker answer the request it is on, then exit
+const retireTiktokPhotoWorker = (worker: TiktokPhotoWorker) => {
+	if (worker.idleTimer) clearTimeout(worker.idleTimer)
+	worker.idleTimer = null
+	tiktokPhotoWorkers.delete(worker)
+	worker.child.stdin?.end()
+}
+
+const restartTiktokPhotoWorkers = () => {
+	for (const worker of [...tiktokPhotoWorkers]) retireTiktokPhotoWorker(worker)
+}
+
+const acquireTiktokPhotoWorker = () => {
+	for (const worker of tiktokPhotoWorkers) {
+		if (!worker.busy) return worker
+	}
+	if (tiktokPhotoWorkers.size < TIKTOK_PHOTO_WORKERS) return spawnTiktokPhotoWorker()
+	return null
+}
+
+const resolveTiktokPhotoInWorker = (worker: TiktokPhotoWorker, url: string) => {
+	return new Promise<unknown>((resolve) => {
+		const id = randomUUID()
+		worker.busy = true
+		if (worker.idleTimer) clearTimeout(worker.idleTimer)
+		worker.idleTimer = null
+		// The timer covers only this request, which is the only one on the
+		// worker; killing it fails this request and a fresh worker is spawned
+		// for the next one
+		const timer = setTimeout(() => worker.child.kill(), TIKTOK_PHOTO_TIMEOUT_MS)
+		worker.pending.set(id, (result) => {
+			clearTimeout(timer)
+			worker.busy = false
+			worker.served += 1
+			if (tiktokPhotoWorkers.has(worker)) {
+				if (worker.served >= TIKTOK_PHOTO_MAX_REQUESTS) {
+					retireTiktokPhotoWorker(worker)
+				} else {
+					worker.idleTimer = setTimeout(
+						() => retireTiktokPhotoWorker(worker),
+						TIKTOK_PHOTO_IDLE_MS,
+					)
+					worker.idleTimer.unref()
+				}
+			}
+			resolve(result)
+		})
+		worker.child.stdin?.write(
+			`${JSON.stringify({ id, url, cookiefile: COOKIE_FILE, proxy_file: PROXY_FILE })}\n`,
+		)
+	})
+}
+
 const resolveTiktokPhoto = async (url: string) => {
 	try {
-		const { stdout } = await execFilePromise("python3", [
-			"src/tiktok_photo_bypass.py",
-			url,
-			COOKIE_FILE,
-			PROXY_FILE,
-		])
-		const trimmed = stdout.trim()
-		if (!trimmed) return { error: "Empty response from tiktok photo resolver" }
-		return JSON.parse(trimmed)
+		const worker = acquireTiktokPhotoWorker()
+		if (!worker) {
+			const { stdout } = await execFilePromise("python3", [
+				"src/tiktok_photo_bypass.py",
+				url,
+				COOKIE_FILE,
+				PROXY_FILE,
+			])
+			const trimmed = stdout.trim()
+			if (!trimmed) return { error: "Empty response from tiktok photo resolver" }
+			return JSON.parse(trimmed)
+		}
+		const result = await resolveTiktokPhotoInWorker(worker, url)
+		if (!result) return { error: "Failed to run tiktok photo resolver" }
+		return result
 	} catch (e) {
 		console.error("TikTok photo resolve error", e)
 		return { error: "Failed to run tiktok photo resolver" }
@@ -3446,7 +3574,7 @@ const scheduleRequestExpiry = (requestId: string) => {
 		}
 	}, 3600000)
 }
-const updater = new Updater()
+const updater = new Updater(restartTiktokPhotoWorkers)
 startSystemHistoryCollector()
 cleanupTempDirs().catch((error) =>
 	console.error("Temp cleanup error:", error),
@@ -1,11 +1,20 @@
+import codecs
 import mimetypes
 import os
+import re
 import sys
 from email import policy
 from email.parser import BytesParser
 from urllib.parse import urlparse
 
 
+def _codec_name(charset: str | None) -> str:
+    try:
+        return codecs.lookup(charset or "utf-8").name
+    except LookupError:
+        return "utf-8"
+
+
 def main() -> int:
     if len(sys.argv) < 3:
         print("Usage: mhtml_extract.py <input.mhtml> <output.html>")
@@ -24,36 +33,70 @@ def main() -> int:
     resources_dir = os.path.join(output_dir, f"{base_name}_files")
     os.makedirs(resources_dir, exist_ok=True)
     used_names = set()
+    # Last counter handed out per base name, so repeated names resume where they left off.
+    name_counters: dict[str, int] = {}
 
     def safe_name(name: str) -> str:
         clean = "".join(c if c.isalnum() or c in "._-" else "_" for c in name)
         if not clean:
             clean = "resource"
-        candidate = clean
-        counter = 1
+        counter = name_counters.get(clean, 1)
+        candidate = clean if counter == 1 else f"{clean}_{counter}"
         while candidate in used_names:
             counter += 1
             candidate = f"{clean}_{counter}"
+        name_counters[clean] = counter
         used_names.add(candidate)
         return candidate
 
+    # First pass: locate the HTML and note each resource's keys from its headers only.
+    parts = []
     for part in message.walk():
         if part.is_multipart():
             continue
         content_type = part.get_content_type()
         if content_type == "text/html" and html_body is None:
-            html_body = part.get_content()
-            if isinstance(html_body, bytes):
-                charset = part.get_content_charset() or "utf-8"
-                html_body = html_body.decode(charset, errors="replace")
+            # Keep the body as UTF-8 bytes end to end; only other charsets pay for
+            # one transcode here.
+            html_body = part.get_payload(decode=True) or b""
+            charset = _codec_name(part.get_content_charset())
+            if charset not in ("utf-8", "ascii"):
+                html_body = html_body.decode(charset, errors="replace").encode("utf-8")
+            continue
+
+        content_id = part.get("Content-ID")
+        content_location = part.get("Content-Location")
+        keys = []
+        if content_id:
+            keys.append(f"cid:{content_id.strip('<>')}".encode("utf-8"))
+        if content_location:
+            keys.append(content_location.encode("utf-8"))
+        if keys:
+            parts.append((part, content_type, content_id, content_location, keys))
+
+    if html_body is None:
+        print("No HTML part found in MHTML.")
+        return 1
+
+    all_keys = {key for *_, keys in parts for key in keys}
+    pattern = None
+    referenced = set()
+    if all_keys:
+        # Longer keys first so a key never pre-empts one it prefixes.
+        pattern = re.compile(
+            b"|".join(re.escape(key) for key in sorted(all_keys, key=len, reverse=True))
+        )
+        referenced = set(pattern.findall(html_body))
+
+    # Second pass: decode and write only the parts the HTML actually points at.
+    for part, content_type, content_id, content_location, keys in parts:
+        if not any(key in referenced for key in keys):
             continue
 
         payload = part.get_payload(decode=True)
         if not payload:
             continue
 
-        content_id = part.get("Content-ID")
-        content_location = part.get("Content-Location")
         ext = mimetypes.guess_extension(content_type) or ".bin"
 
         filename = None
@@ -75,19 +118,15 @@ def main() -> int:
             handle.write(payload)
 
         rel_path = os.path.relpath(file_path, output_dir)
-        if content_id:
-            resources[f"cid:{content_id.strip('<>')}"] = rel_path
-        if content_location:
-            resources[content_location] = rel_path
-
-    if html_body is None:
-        print("No HTML part found in MHTML.")
-        return 1
+        for key in keys:
+            resources[key] = rel_path.encode("utf-8")
 
-    for key, value in resources.items():
-        html_body = html_body.replace(key, value)
+    if pattern is not None and resources:
+        html_body = pattern.sub(
+            lambda match: resources.get(match.group(0), match.group(0)), html_body
+        )
 
-    with open(output_path, "w", encoding="utf-8") as handle:
+    with open(output_path, "wb") as handle:
         handle.write(html_body)
 
     return 0
@@ -1,22 +1,87 @@
 import sys
 import json
+import functools
+import heapq
 import re
 import html
 import os
-from urllib.parse import urlparse, quote
+import threading
+from concurrent.futures import Future
+from urllib.parse import urlparse
 from http.cookiejar import MozillaCookieJar
 from curl_cffi import requests
 
-
-def _extract_meta(html_text, key):
-    pattern = re.compile(
-        r'<meta[^>]+(?:property|name)=["\\\']%s["\\\'][^>]+content=["\\\'](.*?)["\\\']'
-        % re.escape(key),
+try:
+    from selectolax.lexbor import LexborHTMLParser as HTMLParser  # type: ignore
+except ImportError:
+    HTMLParser = None
+
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/131.0.0.0 Safari/537.36"
+)
+_PIN_HEADERS = {
+    "Accept": "application/json",
+    "X-Requested-With": "XMLHttpRequest",
+    "Origin": "https://www.pinterest.com",
+    "User-Agent": USER_AGENT,
+}
+# PinResource query for {pin_id}, pre-quoted: source_url=/pin/<id>/ and
+# data={"options":{"id":"<id>","field_set_key":"detailed",
+# "fetch_visual_search_objects":true},"context":{}}.
+_PIN_RESOURCE_URL = (
+    "https://www.pinterest.com/resource/PinResource/get/?source_url=/pin/{pin_id}/"
+    "&data=%7B%22options%22%3A%7B%22id%22%3A%22{pin_id}%22%2C%22field_set_key%22"
+    "%3A%22detailed%22%2C%22fetch_visual_search_objects%22%3Atrue%7D%2C%22context"
+    "%22%3A%7B%7D%7D"
+)
+
+# Shared client for the page fetch and the PinResource call. curl_cffi keeps one curl
+# handle per thread, so the PinResource call, which runs on a background thread,
+# still opens its own connection to the host.
+_SESSION = requests.Session()
+
+_SIZE_DIR_RE = re.compile(r"/\\d+x/")
+_PIN_ID_RE = re.compile(r"/pin/(\\d+)")
+# Page patterns run over the raw response bytes; only matched URLs get decoded.
+_MP4_URL_RE = re.compile(rb'https?://[^\s"\\\']+?\\.mp4[^\s"\\\']*')
+_M3U8_URL_RE = re.compile(rb'https?://[^\s"\\\']+?\\.m3u8[^\s"\\\']*')
+_PINIMG_URL_RE = re.compile(rb'https?://i\\.pinimg\\.com[^\\s"\\\'<>]+')
+
+
+@functools.lru_cache(maxsize=None)
+def _meta_re(key):
+    return re.compile(
+        rb'<meta[^>]+(?:property|name)=["\\\']%s["\\\'][^>]+content=["\\\'](.*?)["\\\']'
+        % re.escape(key.encode()),
         re.IGNORECASE,
     )
-    match = pattern.search(html_text)
+
+
+def _decode(raw):
+    return raw.decode("utf-8", "replace")
+
+
+def _parse_meta(body):
+    # One parse gives every <meta> tag; the first tag wins, as with the regex.
+    if HTMLParser is None:
+        return None
+    meta = {}
+    for node in HTMLParser(body).css("meta[content]"):
+        attributes = node.attributes
+        key = attributes.get("property") or attributes.get("name")
+        if key:
+            meta.setdefault(key.lower(), attributes.get("content"))
+    return meta
+
+
+def _extract_meta(body, key, meta=None):
+    if meta is not None:
+        return meta.get(key) or None
+    match = _meta_re(key).search(body)
     if match:
-        return html.unescape(match.group(1))
+        return html.unescape(_decode(match.group(1)))
     return None
 
 
@@ -26,11 +91,13 @@ def _score_image(url):
         score += 5
     if "/736x/" in url or "/564x/" in url or "/474x/" in url:
         score += 2
-    if re.search(r"/\\d+x/", url):
+    if _SIZE_DIR_RE.search(url):
         score += 1
     return score, len(url)
 
 
+# The pinimg scan sees the same URL many times per page; parse each one once.
+@functools.lru_cache(maxsize=2048)
 def _normalize_image(url):
     try:
         parsed = urlparse(url)
@@ -64,36 +131,40 @@ def _get_cookie_value(jar, name, domains):
     return None
 
 
-def _extract_url_by_suffix(text, suffix):
-    idx = text.find(suffix)
+def _extract_url_by_suffix(body, suffix):
+    idx = body.find(suffix)
     if idx == -1:
         return None
-    start = text.rfind("http", 0, idx)
+    start = body.rfind(b"http", 0, idx)
     if start == -1:
         return None
     end = idx + len(suffix)
-    while end < len(text) and text[end] not in ['"', "'", "\\\\", " ", "\\n", "\\r", "\\t"]:
+    while end < len(body) and body[end:end + 1] not in [b'"', b"'", b"\\\\", b" ", b"\\n", b"\\r", b"\\t"]:
         end += 1
-    return text[start:end]
+    return body[start:end]
 
 
-def _extract_video_url(text):
-    mp4_matches = re.findall(r'https?://[^\s"\\\']+?\\.mp4[^\s"\\\']*', text)
-    if mp4_matches:
-        return html.unescape(mp4_matches[0])
-    m3u8_matches = re.findall(r'https?://[^\s"\\\']+?\\.m3u8[^\s"\\\']*', text)
-    if m3u8_matches:
-        return html.unescape(m3u8_matches[0])
-    m3u8_fallback = _extract_url_by_suffix(text, ".m3u8")
+def _extract_video_url(body):
+    # Only the first URL is used, so stop at the first match; a plain substring
+    # check skips the regex scan entirely on pages without the extension.
+    match = b"mp4" in body and _MP4_URL_RE.search(body)
+    if match:
+        return html.unescape(_decode(match.group(0)))
+    if b"m3u8" not in body:
+        return None
+    match = _M3U8_URL_RE.search(body)
+    if match:
+        return html.unescape(_decode(match.group(0)))
+    m3u8_fallback = _extract_url_by_suffix(body, b".m3u8")
     if m3u8_fallback:
-        return html.unescape(m3u8_fallback)
+        return html.unescape(_decode(m3u8_fallback))
     return None
 
 
 def _extract_pin_id(url):
     try:
         path = urlparse(url).path
-        match = re.search(r"/pin/(\\d+)", path)
+        match = _PIN_ID_RE.search(path)
         if match:
             return match.group(1)
     except Exception:
@@ -102,50 +173,48 @@ def _extract_pin_id(url):
 
 
 def _find_media_urls(obj, video_urls, image_urls):
-    if isinstance(obj, dict):
-        for key, value in obj.items():
-            if isinstance(value, str):
-                if ".mp4" in value or ".m3u8" in value:
-                    video_urls.append(value)
-                elif "pinimg.com" in value:
-                    image_urls.append(value)
-            else:
-                _find_media_urls(value, video_urls, image_urls)
-    elif isinstance(obj, list):
-        for item in obj:
-            _find_media_urls(item, video_urls, image_urls)
-
-
-def _get_pin_resource(url, cookies):
+    # Depth-first with an explicit stack; children are pushed in reverse so URLs
+    # come out in document order. Only strings held by dicts are media fields.
+    # The caller only uses the first video, so the walk ends there.
+    stack = [obj]
+    while stack:
+        obj = stack.pop()
+        if isinstance(obj, str):
+            if ".mp4" in obj or ".m3u8" in obj:
+                video_urls.append(obj)
+                return
+            elif "pinimg.com" in obj:
+                image_urls.append(obj)
+        elif isinstance(obj, dict):
+            stack.extend(reversed(obj.values()))
+        elif isinstance(obj, list):
+            stack.extend(item for item in reversed(obj) if not isinstance(item, str))
+
+
+def _start_background(func, *args):
+    # Daemon thread rather than an executor: an unneeded request still in flight
+    # must not keep the process alive after the result has been printed.
+    future = Future()
+
+    def run():
+        try:
+            future.set_result(func(*args))
+        except BaseException as exc:
+            future.set_exception(exc)
+
+    threading.Thread(target=run, daemon=True).start()
+    return future
+
+
+def _get_pin_resource(url, cookies, csrf):
     pin_id = _extract_pin_id(url)
     if not pin_id:
         return None
-    host = "www.pinterest.com"
-    source_url = f"/pin/{pin_id}/"
-    data = (
-        '{"options":{"id":"%s","field_set_key":"detailed","fetch_visual_search_objects":true},'
-        '"context":{}}' % pin_id
-    )
-    resource_url = (
-        f"https://{host}/resource/PinResource/get/?source_url="
-        f"{quote(source_url)}&data={quote(data)}"
-    )
-    csrf = _get_cookie_value(cookies, "csrftoken", ["pinterest.com"])
-    headers = {
-        "Accept": "application/json",
-        "X-Requested-With": "XMLHttpRequest",
-        "Referer": url,
-        "Origin": "https://www.pinterest.com",
-        "User-Agent": (
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-            "AppleWebKit/537.36 (KHTML, like Gecko) "
-            "Chrome/131.0.0.0 Safari/537.36"
-        ),
-    }
+    headers = {**_PIN_HEADERS, "Referer": url}
     if csrf:
         headers["X-CSRFToken"] = csrf
-    r = requests.get(
-        resource_url,
+    r = _SESSION.get(
+        _PIN_RESOURCE_URL.format(pin_id=pin_id),
         impersonate="chrome120",
         headers=headers,
         timeout=30,
@@ -161,16 +230,20 @@ def _get_pin_resource(url, cookies):
 
 def resolve_pinterest(url, cookie_file=None):
     result = {"video_url": None, "photo_urls": None, "title": "Pinterest"}
-    headers = {
-        "User-Agent": (
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-            "AppleWebKit/537.36 (KHTML, like Gecko) "
-            "Chrome/131.0.0.0 Safari/537.36"
-        )
-    }
+    headers = {"User-Agent": USER_AGENT}
     cookies = _load_cookies(cookie_file)
+    csrf = _get_cookie_value(cookies, "csrftoken", ["pinterest.com"])
     try:
-        r = requests.get(
+        # The pin id is known from the URL, so request the API fallback alongside
+        # the page instead of after it. This deliberately spends one API request on
+        # every resolve, even when the page's og:video/og:image makes it unneeded,
+        # to take its latency off the fallback path.
+        resource_future = (
+            _start_background(_get_pin_resource, url, cookies, csrf)
+            if _extract_pin_id(url)
+            else None
+        )
+        r = _SESSION.get(
             url,
             impersonate="chrome120",
             headers=headers,
@@ -180,50 +253,41 @@ def resolve_pinterest(url, cookie_file=None):
         if r.status_code != 200:
             return {"error": f"HTTP {r.status_code}"}
 
-        text = r.text
+        body = r.content
+        meta = _parse_meta(body)
 
-        title = _extract_meta(text, "og:title")
+        title = _extract_meta(body, "og:title", meta)
         if title:
             result["title"] = title
 
-        video_url = _extract_meta(text, "og:video:secure_url") or _extract_meta(
-            text, "og:video"
+        video_url = _extract_meta(body, "og:video:secure_url", meta) or _extract_meta(
+            body, "og:video", meta
         )
         if not video_url:
-            video_url = _extract_video_url(text)
+            video_url = _extract_video_url(body)
         if video_url:
             result["video_url"] = html.unescape(video_url)
             return result
 
-        image_url = _extract_meta(text, "og:image:secure_url") or _extract_meta(
-            text, "og:image"
+        image_url = _extract_meta(body, "og:image:secure_url", meta) or _extract_meta(
+            body, "og:image", meta
         )
         image_urls = []
         if image_url:
             image_urls.append(image_url)
 
         if not image_urls:
-            pinimg_matches = re.findall(
-                r'https?://i\\.pinimg\\.com[^\\s"\\\'<>]+', text
-            )
+            pinimg_matches = _PINIMG_URL_RE.findall(body)
             for match in pinimg_matches:
-                image_urls.append(html.unescape(match))
+                image_urls.append(html.unescape(_decode(match)))
 
-        unique = []
-        seen = set()
-        for url_item in image_urls:
-            cleaned = _normalize_image(url_item)
-            if cleaned in seen:
-                continue
-            seen.add(cleaned)
-            unique.append(cleaned)
+        unique = list(dict.fromkeys(map(_normalize_image, image_urls)))
 
         if unique:
-            unique.sort(key=lambda u: _score_image(u), reverse=True)
-            result["photo_urls"] = unique[:10]
+            result["photo_urls"] = heapq.nlargest(10, unique, key=_score_image)
             return result
 
-        resource_data = _get_pin_resource(url, cookies)
+        resource_data = resource_future.result() if resource_future else None
         if resource_data:
             video_urls = []
             image_urls = []
@@ -232,17 +296,9 @@ def resolve_pinterest(url, cookie_file=None):
                 result["video_url"] = html.unescape(video_urls[0])
                 return result
             if image_urls:
-                normalized = []
-                seen = set()
-                for item in image_urls:
-                    cleaned = _normalize_image(item)
-                    if cleaned in seen:
-                        continue
-                    seen.add(cleaned)
-                    normalized.append(cleaned)
+                normalized = list(dict.fromkeys(map(_normalize_image, image_urls)))
                 if normalized:
-                    normalized.sort(key=lambda u: _score_image(u), reverse=True)
-                    result["photo_urls"] = normalized[:10]
+                    result["photo_urls"] = heapq.nlargest(10, normalized, key=_score_image)
                     return result
 
         return {"error": "No media URL found in HTML"}
@@ -2,7 +2,8 @@ import html
 import json
 import re
 import sys
-import urllib.request
+
+from curl_cffi import requests
 
 
 USER_AGENT = (
@@ -10,22 +11,51 @@ USER_AGENT = (
     "AppleWebKit/537.36 (KHTML, like Gecko) "
     "Chrome/131.0.0.0 Safari/537.36"
 )
+MAX_PAGE_BYTES = 8 * 1024 * 1024
+
+_SESSION = requests.Session()
+
+_TITLE_RE = re.compile(r"<title>(.*?)</title>", re.I | re.S)
+_EMBED_FULL_RE = re.compile(r"https?://www\\.pornoxo\\.com/embed/\d+/\d+/?")
+_EMBED_JSON_RE = re.compile(
+    r'embedUrl"\s*:\s*"(?P<url>https?:\\/\\/www\\.pornoxo\\.com\\/embed\\/\\d+\\/\\d+\\/?)"'
+)
+_EMBED_PATH_RE = re.compile(r"/embed/\d+/\d+/?")
+_SOURCES_RE = re.compile(r"var\s+sources\s*=\s*(\[.*?\]);", re.S)
+_MULTI_SOURCE_RE = re.compile(r"var\s+multiSource\s*=\s*'([^']*)'")
+_DESC_NUM_RE = re.compile(r"(\d+)")
 
 
 def fetch_html(url: str) -> str:
-    req = urllib.request.Request(
+    # The page and its embed are fetched over one pooled session; the body is
+    # streamed and capped so an oversized response cannot be buffered whole.
+    response = _SESSION.get(
         url,
         headers={
             "User-Agent": USER_AGENT,
             "Accept": "text/html",
         },
+        impersonate="chrome120",
+        timeout=10,
+        stream=True,
     )
-    with urllib.request.urlopen(req, timeout=10) as resp:
-        return resp.read().decode("utf-8", "ignore")
+    try:
+        response.raise_for_status()
+        chunks: list[bytes] = []
+        size = 0
+        for chunk in response.iter_content():
+            chunks.append(chunk)
+            size += len(chunk)
+            # Fail instead of truncating pages over MAX_PAGE_BYTES
+            if size > MAX_PAGE_BYTES:
+                raise RuntimeError(f"Page exceeds {MAX_PAGE_BYTES} bytes")
+    finally:
+        response.close()
+    return b"".join(chunks).decode("utf-8", "ignore")
 
 
 def extract_title(page: str) -> str | None:
-    match = re.search(r"<title>(.*?)</title>", page, re.I | re.S)
+    match = _TITLE_RE.search(page)
     if not match:
         return None
     title = html.unescape(match.group(1)).strip()
@@ -33,23 +63,20 @@ def extract_title(page: str) -> str | None:
 
 
 def extract_embed_url(page: str) -> str | None:
-    match = re.search(r"https?://www\\.pornoxo\\.com/embed/\d+/\d+/?", page)
+    match = _EMBED_FULL_RE.search(page)
     if match:
         return match.group(0)
-    match = re.search(
-        r'embedUrl"\s*:\s*"(?P<url>https?:\\/\\/www\\.pornoxo\\.com\\/embed\\/\\d+\\/\\d+\\/?)"',
-        page,
-    )
+    match = _EMBED_JSON_RE.search(page)
     if match:
         return match.group("url").replace("\\/", "/")
-    match = re.search(r"/embed/\d+/\d+/?", page)
+    match = _EMBED_PATH_RE.search(page)
     if match:
         return f"https://www.pornoxo.com{match.group(0)}"
     return None
 
 
 def extract_sources(page: str):
-    match = re.search(r"var\s+sources\s*=\s*(\[.*?\]);", page, re.S)
+    match = _SOURCES_RE.search(page)
     if not match:
         return []
     raw = match.group(1)
@@ -60,13 +87,18 @@ def extract_sources(page: str):
 
 
 def extract_multi_source(page: str) -> str | None:
-    match = re.search(r"var\s+multiSource\s*=\s*'([^']*)'", page)
+    match = _MULTI_SOURCE_RE.search(page)
     if not match:
         return None
     value = match.group(1).strip()
     return value or None
 
 
+def _desc_score(item: dict) -> int:
+    match = _DESC_NUM_RE.search(str(item.get("desc", "")))
+    return int(match.group(1)) if match else 0
+
+
 def pick_best_source(sources: list[dict]) -> str | None:
     if not sources:
         return None
@@ -74,11 +106,7 @@ def pick_best_source(sources: list[dict]) -> str | None:
         if str(source.get("active", "")).lower() in ("true", "1"):
             if isinstance(source.get("src"), str):
                 return source["src"]
-    def score(item: dict) -> int:
-        desc = str(item.get("desc", ""))
-        match = re.search(r"(\d+)", desc)
-        return int(match.group(1)) if match else 0
-    best = max(sources, key=score)
+    best = max(sources, key=_desc_score)
     return best.get("src") if isinstance(best.get("src"), str) else None
 
 
@@ -4,6 +4,23 @@ import re
 import html
 from curl_cffi import requests
 
+# One pooled client for every request, so redirects and repeat hosts reuse connections.
+_SESSION = requests.Session()
+
+# Page patterns run over the raw response bytes; only matched values get decoded.
+_VIDEO_FIELD_RE = re.compile(rb'\\"(no_watermark|downloadable_url|contentUrl)\\":\\\"(.*?)\\\"')
+_MP4_RE = re.compile(rb'(https?://[^"\s]+\.mp4[^"\s]*)')
+_PROMPT_RE = re.compile(rb'\\"prompt\\":\\\"(.*?)\\\"')
+
+def _decode(raw):
+    return raw.decode("utf-8", "replace")
+
+def _unescape_js(value):
+    # Only values with a backslash carry JS escapes; leave the rest untouched.
+    if "\\" not in value:
+        return value
+    return value.replace('\\u002F', '/').replace('\\"', '"').replace('\\u0026', '&')
+
 def resolve_savesora(url):
     """
     Try to resolve using savesora.com API to get watermark-free link
@@ -18,7 +35,7 @@ def resolve_savesora(url):
     }
     try:
         # Use a standard browser impersonation
-        r = requests.post(
+        r = _SESSION.post(
             api_url, 
             json={"url": url}, 
             headers=headers, 
@@ -67,56 +84,54 @@ def resolve_sora(url):
 
     # 2. Fallback to Official Sora Parsing
     try:
-        r = requests.get(url, impersonate="chrome120", timeout=30)
+        r = _SESSION.get(url, impersonate="chrome120", timeout=30)
         
         if r.status_code != 200:
             return {"error": f"HTTP {r.status_code}"}
 
+        body = r.content
         video_url = None
         
-        # 0. Try no_watermark from official JSON
-        match = re.search(r'\\"no_watermark\\":\\\"(.*?)\\\"', r.text)
-        if match and match.group(1) and match.group(1) != "null":
-            video_url = match.group(1)
-
-        # 1. Try standard downloadable_url
-        if not video_url:
-            match = re.search(r'\\"downloadable_url\\":\\\"(.*?)\\\"', r.text)
-            if match:
-                video_url = match.group(1)
-            
-        # 2. Try contentUrl
-        if not video_url:
-            match = re.search(r'\\"contentUrl\\":\\\"(.*?)\\\"', r.text)
-            if match:
-                video_url = match.group(1)
+        # 0-2. One scan for the first no_watermark, downloadable_url and contentUrl
+        # values from the official JSON, preferred in that order
+        fields = {}
+        for match in _VIDEO_FIELD_RE.finditer(body):
+            fields.setdefault(match.group(1), match.group(2))
+            if len(fields) == 3 or fields.get(b"no_watermark", b"null") not in (b"", b"null"):
+                break
+        no_watermark = fields.get(b"no_watermark")
+        if no_watermark == b"null":
+            no_watermark = None
+        raw_url = no_watermark or fields.get(b"downloadable_url") or fields.get(b"contentUrl")
+        if raw_url:
+            video_url = _decode(raw_url)
         
         # 3. Fallback: Aggressive MP4 search in HTML
         if not video_url:
-            mp4_matches = re.findall(r'(https?://[^"\s]+\.mp4[^"\s]*)', r.text)
+            mp4_matches = [_decode(m) for m in _MP4_RE.findall(body)]
             if mp4_matches:
                 # Find a likely candidate (e.g., from CDN or without 'thumbnail')
                 for m in mp4_matches:
-                    decoded_m = html.unescape(m.replace('\\u002F', '/').replace('\\"', '"').replace('\\u0026', '&'))
+                    decoded_m = html.unescape(_unescape_js(m))
                     if "videos.openai.com" in decoded_m and "thumbnail" not in decoded_m:
                         video_url = decoded_m
                         break
                 if not video_url: # If no specific match, take the first one
-                    video_url = mp4_matches[0].replace('\\u002F', '/').replace('\\"', '"').replace('\\u0026', '&')
+                    video_url = _unescape_js(mp4_matches[0])
 
         if video_url:
             try:
                 video_url = json.loads(f'"{video_url}"')
             except:
-                video_url = video_url.replace('\\u002F', '/').replace('\\"', '"').replace('\\u0026', '&')
+                video_url = _unescape_js(video_url)
 
             result["video_url"] = html.unescape(video_url)
             
             # Try to find title
-            title_match = re.search(r'\\"prompt\\":\\\"(.*?)\\\"', r.text)
+            title_match = _PROMPT_RE.search(body)
             if title_match:
                  try:
-                    title = json.loads(f'"{title_match.group(1)}"')[:100]
+                    title = json.loads(f'"{_decode(title_match.group(1))}"')[:100]
                     result["title"] = title
                  except:
                     pass
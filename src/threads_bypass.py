@@ -3,9 +3,101 @@ import json
 import re
 import html
 import os
-from urllib.parse import urlsplit
+from urllib.parse import unquote_plus, urlparse, urlsplit
 from curl_cffi import requests
 
+try:
+    from selectolax.lexbor import LexborHTMLParser as HTMLParser  # type: ignore
+except ImportError:
+    HTMLParser = None
+
+try:
+    import orjson  # type: ignore
+except ImportError:
+    orjson = None
+
+# One pooled client for every request, so repeat hosts reuse connections.
+_SESSION = requests.Session()
+
+_POST_CODE_RE = re.compile(r'/post/([^/?]+)')
+_T_SHORTCODE_RE = re.compile(r'/t/([^/?#]+)')
+_POST_SHORTCODE_RE = re.compile(r'/post/([^/?#]+)')
+_SCORE_RE = re.compile(r"(?:p|s)(\\d+)x(\\d+)")
+_IG_CACHE_KEY_RE = re.compile(r'[?&]ig_cache_key=([^&#]+)')
+# Page patterns run over the raw response bytes; only matched URLs get decoded.
+_SJS_SCRIPT_RE = re.compile(
+    rb'<script[^>]*type="application/json"[^>]*data-sjs[^>]*>(.*?)</script>',
+    re.DOTALL,
+)
+_OG_VIDEO_PREFIX = b'property="og:video" content="'
+_OG_VIDEO_SECURE_PREFIX = b'property="og:video:secure_url" content="'
+_MP4_RE = re.compile(rb'https?://[^\s"\'\\]+?\.mp4[^\s"\'\\]*')
+_ESCAPED_MP4_RE = re.compile(rb'https?:\\\\/\\\\/[^\\s"\\\\]+?\\.mp4[^\\s"\\\\]*')
+_JSON_VIDEO_URL_RE = re.compile(rb'"(?:video_url|playback_url)"\s*:\s*"(.*?)"')
+
+def _decode(raw):
+    return raw.decode("utf-8", "replace")
+
+def _parse_json(text):
+    # orjson is several times faster on the large SJS payloads; it is stricter
+    # than json in a few corners, so anything it rejects gets a second try.
+    if orjson is not None:
+        try:
+            return orjson.loads(text)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(text)
+
+def _find_quoted_after(body, prefix):
+    # Only reached when selectolax is missing; production reads og:video from the tree.
+    # Same result as re.search(prefix + '(.*?)"') for a literal prefix, using
+    # plain finds: the value runs to the next quote and may not span a newline.
+    start = body.find(prefix)
+    while start != -1:
+        start += len(prefix)
+        end = body.find(b'"', start)
+        if end == -1:
+            return None
+        if body.find(b"\n", start, end) == -1:
+            return body[start:end]
+        start = body.find(prefix, start)
+    return None
+
+def _first_meta_link(pattern, body):
+    # Stop at the first Meta CDN link rather than collecting every match
+    for match in pattern.finditer(body):
+        link = match.group(0)
+        if b"fbcdn.net" in link or b"instagram" in link:
+            return link
+    return None
+
+def _load_cookies(path):
+    # Line by line rather than MozillaCookieJar.load, which rejects the whole file
+    # over one bad line; the shared cookies.txt keeps whatever other sites upload.
+    if not path or not os.path.exists(path):
+        return None
+    cookies = requests.Cookies()
+    try:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            for line in f:
+                line = line.rstrip("\r\n")
+                if line.startswith("#HttpOnly_"):
+                    line = line[len("#HttpOnly_"):]
+                elif line.startswith("#") or not line.strip():
+                    continue
+                parts = line.split("\t")
+                if len(parts) != 7:
+                    continue
+                domain, domain_flag, path_, secure, _expires, name, value = parts
+                if domain_flag not in ("TRUE", "FALSE") or secure not in ("TRUE", "FALSE"):
+                    continue
+                if (domain_flag == "TRUE") != domain.startswith("."):
+                    continue
+                cookies.set(name, value, domain=domain, path=path_ or "/", secure=secure == "TRUE")
+    except OSError:
+        return None
+    return cookies
+
 def resolve_threads(url):
     COOKIE_FILE = "/app/storage/cookies.txt"
     
@@ -13,7 +105,7 @@ def resolve_threads(url):
     url = url.replace("threads.com", "threads.net")
     if "/post/" in url and "/t/" not in url:
         # Some tools prefer the /t/ format
-        match = re.search(r'/post/([^/?]+)', url)
+        match = _POST_CODE_RE.search(url)
         if match:
             parsed = urlsplit(url)
             url = f"https://www.threads.net/t/{match.group(1)}"
@@ -23,8 +115,11 @@ def resolve_threads(url):
     def clean_url(value):
         if not value:
             return value
-        value = value.replace("\\u0026", "&").replace("\\u002F", "/")
-        value = value.replace("\\/", "/")
+        # Most values come out of json.loads already unescaped; skip the
+        # replace chain unless there is a backslash to act on.
+        if "\\" in value:
+            value = value.replace("\\u0026", "&").replace("\\u002F", "/")
+            value = value.replace("\\/", "/")
         return html.unescape(value)
 
     def is_image_url(value):
@@ -33,10 +128,10 @@ def resolve_threads(url):
         lowered = value.lower()
         if "profile_pic" in lowered or "/t51.2885-19/" in lowered:
             return False
-        return any(ext in lowered for ext in [".jpg", ".jpeg", ".png", ".webp"])
+        return lowered.split("?", 1)[0].endswith((".jpg", ".jpeg", ".png", ".webp"))
 
     def score_image_url(value):
-        match = re.search(r"(?:p|s)(\\d+)x(\\d+)", value)
+        match = _SCORE_RE.search(value)
         if not match:
             return 0
         return int(match.group(1)) * int(match.group(2))
@@ -56,30 +151,29 @@ def resolve_threads(url):
         return max(candidates, key=score_candidate)
 
     def extract_shortcode(value):
-        match = re.search(r'/t/([^/?#]+)', value)
+        match = _T_SHORTCODE_RE.search(value)
         if match:
             return match.group(1)
-        match = re.search(r'/post/([^/?#]+)', value)
+        match = _POST_SHORTCODE_RE.search(value)
         if match:
             return match.group(1)
         return None
 
     def find_media_by_code(obj, shortcode):
-        if isinstance(obj, dict):
-            code = obj.get("code") or obj.get("shortcode")
-            if code == shortcode and (
-                "carousel_media" in obj or "image_versions2" in obj
-            ):
-                return obj
-            for v in obj.values():
-                found = find_media_by_code(v, shortcode)
-                if found:
-                    return found
-        elif isinstance(obj, list):
-            for v in obj:
-                found = find_media_by_code(v, shortcode)
-                if found:
-                    return found
+        # Pre-order walk with an explicit stack (children pushed in reverse), so the
+        # first match is the same one the recursive search found.
+        stack = [obj]
+        while stack:
+            obj = stack.pop()
+            if isinstance(obj, dict):
+                code = obj.get("code") or obj.get("shortcode")
+                if code == shortcode and (
+                    "carousel_media" in obj or "image_versions2" in obj
+                ):
+                    return obj
+                stack.extend(reversed(obj.values()))
+            elif isinstance(obj, list):
+                stack.extend(reversed(obj))
         return None
 
     def extract_photos_from_media(media):
@@ -125,24 +219,14 @@ def resolve_threads(url):
         return None
 
     def select_best_images(urls):
-        from urllib.parse import urlparse, parse_qs
-
+        # Group renditions of one image by ig_cache_key (path when absent),
+        # keeping first-seen group order, and take the largest of each.
         groups = {}
-        ordered_keys = []
         for url in urls:
-            parsed = urlparse(url)
-            query = parse_qs(parsed.query)
-            key = query.get("ig_cache_key", [None])[0] or parsed.path
-            if key not in groups:
-                groups[key] = []
-                ordered_keys.append(key)
-            groups[key].append(url)
-
-        best_urls = []
-        for key in ordered_keys:
-            candidates = groups[key]
-            best_urls.append(max(candidates, key=score_image_url))
-        return best_urls
+            match = _IG_CACHE_KEY_RE.search(url)
+            key = unquote_plus(match.group(1)) if match else urlparse(url).path
+            groups.setdefault(key, []).append(url)
+        return [max(candidates, key=score_image_url) for candidates in groups.values()]
 
     headers = {
         "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
@@ -156,27 +240,25 @@ def resolve_threads(url):
 
     try:
         # Load cookies if available
-        session = requests.Session()
-        if os.path.exists(COOKIE_FILE):
-            # Simple Netscape cookie parser for requests
-            with open(COOKIE_FILE, 'r') as f:
-                for line in f:
-                    if not line.startswith('#') and line.strip():
-                        parts = line.split('\t')
-                        if len(parts) >= 7:
-                            session.cookies.set(parts[5], parts[6].strip(), domain=parts[0])
-
-        r = session.get(url, impersonate="chrome120", headers=headers, timeout=30)
+        cookies = _load_cookies(COOKIE_FILE)
+
+        r = _SESSION.get(url, impersonate="chrome120", headers=headers, timeout=30, cookies=cookies)
         
         if r.status_code != 200:
             return {"error": f"HTTP {r.status_code}"}
 
+        body = r.content
+
+        tree = HTMLParser(body) if HTMLParser is not None else None
+
         # 1. Parse data-sjs JSON payloads for embedded media URLs
-        scripts = re.findall(
-            r'<script[^>]*type="application/json"[^>]*data-sjs[^>]*>(.*?)</script>',
-            r.text,
-            re.DOTALL,
-        )
+        if tree is not None:
+            scripts = [
+                node.text()
+                for node in tree.css('script[type="application/json"][data-sjs]')
+            ]
+        else:
+            scripts = [_decode(script) for script in _SJS_SCRIPT_RE.findall(body)]
         shortcode = extract_shortcode(url)
         video_urls = []
         image_urls = []
@@ -184,7 +266,7 @@ def resolve_threads(url):
             if "RelayPrefetchedStreamCache" not in script:
                 continue
             try:
-                payload = json.loads(script)
+                payload = _parse_json(script)
             except Exception:
                 continue
 
@@ -198,23 +280,25 @@ def resolve_threads(url):
                     if photo_urls:
                         return {"photo_urls": photo_urls, "title": "Threads Photos (SJS)"}
 
+            # json.loads only builds plain dict/list/str, so exact type checks are
+            # safe here. Nearly every string is not a Meta CDN URL; test for the
+            # host before paying for clean_url.
             stack = [payload]
             while stack:
                 obj = stack.pop()
-                if isinstance(obj, dict):
+                obj_type = type(obj)
+                if obj_type is dict:
                     stack.extend(obj.values())
-                elif isinstance(obj, list):
+                elif obj_type is list:
                     stack.extend(obj)
-                elif isinstance(obj, str):
-                    cleaned = clean_url(obj)
-                    if not cleaned:
+                elif obj_type is str:
+                    if "fbcdn.net" not in obj and "instagram" not in obj:
                         continue
+                    cleaned = clean_url(obj)
                     if ".mp4" in cleaned or "m3u8" in cleaned:
-                        if "fbcdn.net" in cleaned or "instagram" in cleaned:
-                            video_urls.append(cleaned)
+                        video_urls.append(cleaned)
                     elif is_image_url(cleaned):
-                        if "fbcdn.net" in cleaned or "instagram" in cleaned:
-                            image_urls.append(cleaned)
+                        image_urls.append(cleaned)
 
         if video_urls:
             return {"video_url": video_urls[0], "title": "Threads Video (SJS)"}
@@ -230,35 +314,38 @@ def resolve_threads(url):
             return {"photo_urls": best_images, "title": "Threads Photos (SJS)"}
 
         # 2. Look for og:video
-        match = re.search(r'property="og:video" content="(.*?)"', r.text)
-        if match:
-            return {"video_url": clean_url(match.group(1)), "title": "Threads Video"}
+        if tree is not None:
+            node = tree.css_first('meta[property="og:video"][content]')
+            if node is None:
+                node = tree.css_first('meta[property="og:video:secure_url"][content]')
+            og_video = node.attributes.get("content") if node is not None else None
+        else:
+            og_video = _find_quoted_after(body, _OG_VIDEO_PREFIX)
+            if og_video is None:
+                og_video = _find_quoted_after(body, _OG_VIDEO_SECURE_PREFIX)
+            if og_video is not None:
+                og_video = _decode(og_video)
+        if og_video is not None:
+            return {"video_url": clean_url(og_video), "title": "Threads Video"}
 
-        match = re.search(r'property="og:video:secure_url" content="(.*?)"', r.text)
-        if match:
-            return {"video_url": clean_url(match.group(1)), "title": "Threads Video"}
-
-        # 3. Look for any fbcdn .mp4 links (the ones you saw in DevTools)
-        # They are often inside JSON-like strings in the HTML
-        mp4_links = re.findall(r'https?://[^\s"\'\\]+?\.mp4[^\s"\'\\]*', r.text)
-        if mp4_links:
-            # Filter for Meta CDN
-            meta_links = [l for l in mp4_links if "fbcdn.net" in l or "instagram" in l]
-            if meta_links:
-                # Take the first one and clean it
-                return {"video_url": clean_url(meta_links[0]), "title": "Threads Video (CDN)"}
-
-        # 4. Look for JSON-escaped mp4 links
-        escaped_links = re.findall(r'https?:\\\\/\\\\/[^\\s"\\\\]+?\\.mp4[^\\s"\\\\]*', r.text)
-        if escaped_links:
-            meta_links = [l for l in escaped_links if "fbcdn.net" in l or "instagram" in l]
-            if meta_links:
-                return {"video_url": clean_url(meta_links[0]), "title": "Threads Video (CDN)"}
+        # Both link patterns below need "mp4" in the page; skip them outright
+        # when a plain substring check says it is not there
+        if b"mp4" in body:
+            # 3. Look for any fbcdn .mp4 links (the ones you saw in DevTools)
+            # They are often inside JSON-like strings in the HTML
+            meta_link = _first_meta_link(_MP4_RE, body)
+            if meta_link is not None:
+                return {"video_url": clean_url(_decode(meta_link)), "title": "Threads Video (CDN)"}
+
+            # 4. Look for JSON-escaped mp4 links
+            meta_link = _first_meta_link(_ESCAPED_MP4_RE, body)
+            if meta_link is not None:
+                return {"video_url": clean_url(_decode(meta_link)), "title": "Threads Video (CDN)"}
 
         # 5. Look for video_url/playback_url fields
-        json_url_matches = re.findall(r'"(?:video_url|playback_url)"\s*:\s*"(.*?)"', r.text)
+        json_url_matches = _JSON_VIDEO_URL_RE.findall(body)
         for match_url in json_url_matches:
-            cleaned = clean_url(match_url)
+            cleaned = clean_url(_decode(match_url))
             if cleaned and ("fbcdn.net" in cleaned or "instagram" in cleaned):
                 return {"video_url": cleaned, "title": "Threads Video (JSON)"}
 
@@ -1,4 +1,5 @@
 import json
+import os
 import re
 import sys
 from urllib.parse import urlparse, urlunparse
@@ -6,6 +7,18 @@ from urllib.parse import urlparse, urlunparse
 from yt_dlp import YoutubeDL
 from yt_dlp.extractor.tiktok import TikTokIE
 
+try:
+    import orjson  # type: ignore
+except ImportError:
+    orjson = None
+
+_PHOTO_RE = re.compile(r"/photo/")
+_IMAGE_URL_KEYS = ("imageURL", "imageUrl", "image_url", "displayImage", "display_image")
+_URL_LIST_KEYS = ("urlList", "url_list")
+_YDL_CACHE_SIZE = 4
+# (cookiefile, proxy) -> (cookie mtime, YoutubeDL, TikTokIE)
+_YDL_CACHE: dict = {}
+
 
 class QuietLogger:
     def debug(self, msg):
@@ -18,16 +31,37 @@ class QuietLogger:
         pass
 
 
+_QUIET_LOGGER = QuietLogger()
+
+
 def normalize_tiktok_url(url: str) -> str:
     try:
         parsed = urlparse(url)
         path = parsed.path or ""
-        path = re.sub(r"/photo/", "/video/", path)
+        path = _PHOTO_RE.sub("/video/", path)
         return urlunparse(parsed._replace(path=path))
     except Exception:
         return url
 
 
+def first_value(mapping: dict, keys: tuple[str, ...]):
+    for key in keys:
+        value = mapping.get(key)
+        if value:
+            return key, value
+    return None, None
+
+
+def write_json(result, stream=None) -> None:
+    stream = stream or sys.stdout
+    # orjson writes UTF-8 directly, which is what ensure_ascii=False produces
+    if orjson is not None:
+        stream.buffer.write(orjson.dumps(result) + b"\n")
+        stream.buffer.flush()
+    else:
+        print(json.dumps(result, ensure_ascii=False), file=stream, flush=True)
+
+
 def read_file_trim(path: str | None) -> str:
     if not path:
         return ""
@@ -38,13 +72,20 @@ def read_file_trim(path: str | None) -> str:
         return ""
 
 
-def extract_images(url: str, cookiefile: str | None, proxy: str | None):
+def _build_ydl_ie(cookiefile: str | None, proxy: str | None):
     opts = {
         "quiet": True,
         "no_warnings": True,
-        "logger": QuietLogger(),
+        "logger": _QUIET_LOGGER,
         "cookiefile": cookiefile or None,
         "proxy": proxy or None,
+        # Only the page JSON is read, so fail fast instead of sitting through
+        # yt-dlp's default retry backoff, and keep no on-disk cache
+        "skip_download": True,
+        "socket_timeout": 10,
+        "retries": 1,
+        "extractor_retries": 1,
+        "cachedir": False,
         "http_headers": {
             "User-Agent": (
                 "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
@@ -54,61 +95,100 @@ def extract_images(url: str, cookiefile: str | None, proxy: str | None):
         },
     }
 
-    with YoutubeDL(opts) as ydl:
-        ie = TikTokIE(ydl)
-        ie.initialize()
-        video_id = url.rstrip("/").split("/")[-1]
-        video_data, _status = ie._extract_web_data_and_status(url, video_id, fatal=True)
-        if not isinstance(video_data, dict):
-            return None
-
-        image_post = (
-            video_data.get("imagePost")
-            or video_data.get("image_post")
-            or video_data.get("imagePostInfo")
-            or video_data.get("image_post_info")
-            or {}
-        )
-        images = image_post.get("images") or []
-        urls: list[str] = []
-        for image in images:
-            if not isinstance(image, dict):
-                continue
-            image_url = (
-                image.get("imageURL")
-                or image.get("imageUrl")
-                or image.get("image_url")
-                or image.get("displayImage")
-                or image.get("display_image")
-            )
-            if isinstance(image_url, dict):
-                url_list = image_url.get("urlList") or image_url.get("url_list") or []
-                if url_list:
-                    urls.append(url_list[0])
-            elif isinstance(image_url, list):
-                if image_url:
-                    urls.append(image_url[0])
-            elif isinstance(image_url, str):
-                urls.append(image_url)
-
-        author = video_data.get("author") or {}
-        return {
-            "photo_urls": urls,
-            "author_name": author.get("nickname") or author.get("uniqueId"),
-            "author_username": author.get("uniqueId"),
-        }
+    ydl = YoutubeDL(opts)
+    ie = TikTokIE(ydl)
+    ie.initialize()
+    return ydl, ie
 
 
-def main():
-    if len(sys.argv) < 2:
-        print(json.dumps({"error": "No URL provided"}))
-        return
+def _cookie_mtime(cookiefile: str | None) -> int | None:
+    try:
+        return os.stat(cookiefile).st_mtime_ns if cookiefile else None
+    except OSError:
+        return None
 
-    url = sys.argv[1]
-    cookiefile = sys.argv[2] if len(sys.argv) > 2 else None
-    proxy_file = sys.argv[3] if len(sys.argv) > 3 else None
-    proxy_value = read_file_trim(proxy_file)
 
+def _close_ydl(ydl, save_cookies: bool) -> None:
+    # close() also writes the jar back to the cookie file; skip that unless asked
+    if not save_cookies:
+        ydl.params["cookiefile"] = None
+    ydl.close()
+
+
+def _get_ydl_ie(cookiefile: str | None, proxy: str | None):
+    # The worker serves many URLs with the same cookies and proxy, so the
+    # YoutubeDL/TikTokIE pair is built once per combination and rebuilt when
+    # the cookie file changes, so freshly uploaded cookies are picked up.
+    key = (cookiefile or None, proxy or None)
+    cookie_mtime = _cookie_mtime(key[0])
+    cached = _YDL_CACHE.pop(key, None)
+    if cached is not None:
+        if cached[0] == cookie_mtime:
+            _YDL_CACHE[key] = cached
+            return cached[1], cached[2]
+        # The file was replaced under us; close without writing the stale jar over it
+        _close_ydl(cached[1], save_cookies=False)
+    while len(_YDL_CACHE) >= _YDL_CACHE_SIZE:
+        # Hits are re-inserted above, so the first entry is the least recently used
+        _, ydl, _ = _YDL_CACHE.pop(next(iter(_YDL_CACHE)))
+        _close_ydl(ydl, save_cookies=False)
+    ydl, ie = _build_ydl_ie(*key)
+    _YDL_CACHE[key] = (cookie_mtime, ydl, ie)
+    return ydl, ie
+
+
+def _close_ydls(save_cookies: bool) -> None:
+    while _YDL_CACHE:
+        _, (_, ydl, _) = _YDL_CACHE.popitem()
+        _close_ydl(ydl, save_cookies)
+
+
+def extract_images(url: str, cookiefile: str | None, proxy: str | None):
+    _ydl, ie = _get_ydl_ie(cookiefile, proxy)
+    video_id = url.rstrip("/").split("/")[-1]
+    video_data, _status = ie._extract_web_data_and_status(url, video_id, fatal=True)
+    if not isinstance(video_data, dict):
+        return None
+
+    image_post = (
+        video_data.get("imagePost")
+        or video_data.get("image_post")
+        or video_data.get("imagePostInfo")
+        or video_data.get("image_post_info")
+        or {}
+    )
+    images = image_post.get("images") or []
+    urls: list[str] = []
+    # A response spells its keys one way for every image, so try the key that
+    # matched last time before walking the full list of variants
+    image_key = list_key = None
+    for image in images:
+        if not isinstance(image, dict):
+            continue
+        image_url = image.get(image_key) if image_key else None
+        if not image_url:
+            image_key, image_url = first_value(image, _IMAGE_URL_KEYS)
+        if isinstance(image_url, dict):
+            url_list = image_url.get(list_key) if list_key else None
+            if not url_list:
+                list_key, url_list = first_value(image_url, _URL_LIST_KEYS)
+            if url_list:
+                urls.append(url_list[0])
+        elif isinstance(image_url, list):
+            if image_url:
+                urls.append(image_url[0])
+        elif isinstance(image_url, str):
+            urls.append(image_url)
+
+    author = video_data.get("author") or {}
+    return {
+        "photo_urls": urls,
+        "author_name": author.get("nickname") or author.get("uniqueId"),
+        "author_username": author.get("uniqueId"),
+    }
+
+
+def resolve(url: str, cookiefile: str | None, proxy_value: str):
     normalized = normalize_tiktok_url(url)
 
     result = None
@@ -128,10 +208,60 @@ def main():
                 error = str(exc)
 
     if result and result.get("photo_urls"):
-        print(json.dumps(result, ensure_ascii=False))
+        return result
+
+    return {"error": error or "No images found"}
+
+
+def run_worker():
+    # One JSON request per stdin line, answered with one {"id", "result"} JSON
+    # line on stdout, so the bot keeps the process and yt-dlp is imported once.
+    # Replies carry the request's id; anything else printed while resolving
+    # goes to stderr so it cannot be mistaken for a reply.
+    replies = sys.stdout
+    sys.stdout = sys.stderr
+    try:
+        for line in sys.stdin:
+            line = line.strip()
+            if not line:
+                continue
+            request_id = None
+            try:
+                request = orjson.loads(line) if orjson is not None else json.loads(line)
+                request_id = request.get("id")
+                result = resolve(
+                    request.get("url") or "",
+                    request.get("cookiefile") or None,
+                    read_file_trim(request.get("proxy_file")),
+                )
+            except Exception as exc:
+                result = {"error": str(exc)}
+            write_json({"id": request_id, "result": result}, replies)
+    finally:
+        # The cookie file is shared with the other workers and the bot, so a
+        # long-lived jar never writes back over it; the one-shot path persists
+        _close_ydls(save_cookies=False)
+
+
+def main():
+    if len(sys.argv) < 2:
+        write_json({"error": "No URL provided"})
+        return
+
+    if sys.argv[1] == "--worker":
+        run_worker()
         return
 
-    print(json.dumps({"error": error or "No images found"}))
+    url = sys.argv[1]
+    cookiefile = sys.argv[2] if len(sys.argv) > 2 else None
+    proxy_file = sys.argv[3] if len(sys.argv) > 3 else None
+    proxy_value = read_file_trim(proxy_file)
+
+    try:
+        write_json(resolve(url, cookiefile, proxy_value))
+    finally:
+        # Same as the old `with YoutubeDL(...)` block: refreshed cookies are saved
+        _close_ydls(save_cookies=True)
 
 
 if __name__ == "__main__":
@@ -7,8 +7,12 @@ export class Updater {
 	public updating: Promise<void> | false = false
 
 	#job: Cron | null = null
+	#onUpdated: (() => void) | undefined
 
-	constructor() {
+	// onUpdated runs after each successful update, e.g. to restart long-lived
+	// processes that already imported the old yt-dlp
+	constructor(onUpdated?: () => void) {
+		this.#onUpdated = onUpdated
 		console.log("Auto-update is", this.enabled ? "enabled" : "disabled")
 		if (!this.enabled) return
 
@@ -47,6 +51,7 @@ export class Updater {
 
 			console.log(result.stdout)
 			console.log("yt-dlp updated")
+			this.#onUpdated?.()
 		} catch (error) {
 			if (error instanceof Error) {
 				console.error("yt-dlp update failed")
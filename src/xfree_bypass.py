@@ -4,35 +4,108 @@ import re
 import html
 from curl_cffi import requests
 
+try:
+    from selectolax.lexbor import LexborHTMLParser as HTMLParser  # type: ignore
+except ImportError:
+    HTMLParser = None
+
+# One pooled client for every request, so repeat hosts reuse connections.
+_SESSION = requests.Session()
+
+# Without selectolax, one pass over the raw response bytes picks up the
+# og:video/og:title meta tags, the <title> fallback and bare .mp4 links; only
+# the captured groups get decoded.
+_PAGE_RE = re.compile(
+    rb'<meta[^>]*?property="og:(video|title)"[^>]*?content="(.*?)"'
+    rb'|<title>([^<\n]*)</title>'
+    rb'|(https?://[^\s"\'<>]+?\.mp4[^\s"\'<>]*)'
+)
+_MP4_RE = re.compile(rb'https?://[^\s"\'<>]+?\.mp4[^\s"\'<>]*')
+
+def _decode(raw):
+    return html.unescape(raw.decode("utf-8", "replace"))
+
+def _scan_page_tree(body):
+    tree = HTMLParser(body)
+    video_url = title = None
+
+    # Prefer og:video; links inside inline scripts are not elements, so the
+    # MP4 fallback still scans the raw bytes
+    node = tree.css_first('meta[property="og:video"][content]')
+    if node is not None:
+        video_url = node.attributes.get("content")
+    else:
+        match = _MP4_RE.search(body)
+        if match:
+            video_url = _decode(match.group(0))
+
+    # Prefer og:title, falling back to <title>
+    node = tree.css_first('meta[property="og:title"][content]')
+    if node is not None:
+        title = node.attributes.get("content")
+    else:
+        node = tree.css_first("title")
+        if node is not None:
+            title = node.text()
+    return video_url, title
+
+def _scan_page_regex(body):
+    og_video = og_title = page_title = mp4_url = None
+    for match in _PAGE_RE.finditer(body):
+        og_key, og_value, title_value, mp4_value = match.groups()
+        if mp4_url is None and mp4_value is None:
+            # A tag match swallows any link inside it; keep the first one
+            inner = _MP4_RE.search(body, match.start(), match.end())
+            if inner:
+                mp4_url = inner.group(0)
+        if og_key == b"video":
+            if og_video is None:
+                og_video = og_value
+        elif og_key == b"title":
+            if og_title is None:
+                og_title = og_value
+        elif title_value is not None:
+            if page_title is None:
+                page_title = title_value
+        elif mp4_url is None:
+            mp4_url = mp4_value
+        # Nothing later in the page can override the two og tags
+        if og_video is not None and og_title is not None:
+            break
+
+    video_url = og_video if og_video is not None else mp4_url
+    title = og_title if og_title is not None else page_title
+    return (
+        _decode(video_url) if video_url is not None else None,
+        _decode(title) if title is not None else None,
+    )
+
 def resolve_xfree(url):
     result = {"video_url": None, "title": "Xfree Video"}
     headers = {
         "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36"
     }
     try:
-        r = requests.get(url, impersonate="chrome120", headers=headers, timeout=30)
+        r = _SESSION.get(url, impersonate="chrome120", headers=headers, timeout=30)
         
         if r.status_code != 200:
             return {"error": f"HTTP {r.status_code}"}
 
-        # Search for MP4 links in og:video first
-        video_match = re.search(r'<meta[^>]*?property="og:video"[^>]*?content="(.*?)"', r.text)
-        if video_match:
-            result["video_url"] = html.unescape(video_match.group(1))
+        body = r.content
+        # Neither og:video nor the MP4 fallback can match without these
+        # markers; a substring check is far cheaper than parsing the page
+        if b"og:video" not in body and b".mp4" not in body:
+            return {"error": "No video URL found in HTML"}
+
+        if HTMLParser is not None:
+            video_url, title = _scan_page_tree(body)
         else:
-            # Fallback to general MP4 search
-            mp4_matches = re.findall(r'https?://[^\s"\'<>]+?\.mp4[^\s"\'<>]*', r.text)
-            if mp4_matches:
-                result["video_url"] = html.unescape(mp4_matches[0])
-            
-        # Try to find title in meta tags
-        title_match = re.search(r'<meta[^>]*?property="og:title"[^>]*?content="(.*?)"', r.text)
-        if title_match:
-            result["title"] = html.unescape(title_match.group(1))
-        elif not title_match:
-            title_match = re.search(r'<title>(.*?)</title>', r.text)
-            if title_match:
-                result["title"] = html.unescape(title_match.group(1))
+            video_url, title = _scan_page_regex(body)
+
+        if video_url is not None:
+            result["video_url"] = video_url
+        if title is not None:
+            result["title"] = title
             
         if result["video_url"]:
             return result
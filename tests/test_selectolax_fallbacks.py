@@ -0,0 +1,123 @@
+import json
+import os
+import sys
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import generic_bypass  # noqa: E402
+import pinterest_bypass  # noqa: E402
+import threads_bypass  # noqa: E402
+import xfree_bypass  # noqa: E402
+
+# The Docker image installs selectolax, so these force the regex fallbacks each
+# script keeps for environments without it and check they agree with the DOM path.
+
+
+def _response(body: bytes):
+    return SimpleNamespace(status_code=200, content=body)
+
+
+def _without_selectolax(module):
+    return mock.patch.object(module, "HTMLParser", None)
+
+
+SJS_PAYLOAD = {
+    "RelayPrefetchedStreamCache": True,
+    "data": {
+        "code": "ABC123",
+        "image_versions2": {"candidates": []},
+        "video_versions": [
+            {"url": "https://scontent.fbcdn.net/v/small.mp4", "width": 320, "height": 240},
+            {"url": "https://scontent.fbcdn.net/v/large.mp4", "width": 1280, "height": 720},
+        ],
+    },
+}
+
+THREADS_PAGES = {
+    "sjs": (
+        b'<html><script type="application/json" data-sjs>'
+        + json.dumps(SJS_PAYLOAD).encode()
+        + b"</script></html>"
+    ),
+    "og_video": (
+        b'<html><head><meta property="og:video" '
+        b'content="https://scontent.fbcdn.net/v/og.mp4?a=1&amp;b=2"></head></html>'
+    ),
+    "cdn_link": b'<html><script>var x = "https://video.fbcdn.net/v/cdn.mp4";</script></html>',
+}
+
+XFREE_PAGES = {
+    "og": (
+        b'<html><head><title>Page</title><meta property="og:title" content="Clip &amp; more">'
+        b'<meta property="og:video" content="https://cdn.xfree.com/v/1.mp4"></head></html>'
+    ),
+    "title_and_mp4": (
+        b"<html><head><title>Only title</title></head>"
+        b'<script>var src = "https://cdn.xfree.com/v/2.mp4?t=1";</script></html>'
+    ),
+}
+
+GENERIC_PAGE = (
+    '<html><head><meta property="og:video" content="https://cdn.example.com/og.mp4">'
+    '<meta name="twitter:player:stream" content="https://cdn.example.com/tw.m3u8"></head>'
+    '<body><video src="/media/v.mp4"><source src="https://cdn.example.com/s.mp4"></video>'
+    '<iframe src="https://player.example.com/embed/1"></iframe>'
+    '<script>{"file": "https://cdn.example.com/j.mp4"}</script></body></html>'
+)
+
+PINTEREST_PAGE = (
+    b'<html><head><meta property="og:title" content="A &amp; B">'
+    b'<meta property="og:image" content="https://i.pinimg.com/736x/aa/bb.jpg"></head></html>'
+)
+
+
+class ThreadsFallbackTest(unittest.TestCase):
+    def resolve(self, body):
+        with mock.patch.object(threads_bypass._SESSION, "get", return_value=_response(body)):
+            return threads_bypass.resolve_threads("https://www.threads.net/t/ABC123")
+
+    def test_regex_path_matches_dom_path(self):
+        for name, body in THREADS_PAGES.items():
+            with self.subTest(page=name):
+                expected = self.resolve(body)
+                with _without_selectolax(threads_bypass):
+                    self.assertEqual(self.resolve(body), expected)
+                self.assertIn("video_url", expected)
+
+
+class XfreeFallbackTest(unittest.TestCase):
+    def test_regex_path_matches_dom_path(self):
+        for name, body in XFREE_PAGES.items():
+            with self.subTest(page=name):
+                expected = xfree_bypass._scan_page_tree(body)
+                self.assertEqual(xfree_bypass._scan_page_regex(body), expected)
+                self.assertIsNotNone(expected[0])
+
+
+class GenericFallbackTest(unittest.TestCase):
+    def test_regex_path_matches_dom_path(self):
+        expected = generic_bypass.collect_candidates(GENERIC_PAGE, "https://example.com/")
+        with _without_selectolax(generic_bypass):
+            actual = generic_bypass.collect_candidates(GENERIC_PAGE, "https://example.com/")
+        self.assertEqual(actual, expected)
+        self.assertIn("https://example.com/media/v.mp4", expected)
+
+
+class PinterestFallbackTest(unittest.TestCase):
+    def test_regex_path_matches_dom_path(self):
+        meta = pinterest_bypass._parse_meta(PINTEREST_PAGE)
+        with _without_selectolax(pinterest_bypass):
+            self.assertIsNone(pinterest_bypass._parse_meta(PINTEREST_PAGE))
+        for key in ("og:title", "og:image", "og:video"):
+            with self.subTest(key=key):
+                self.assertEqual(
+                    pinterest_bypass._extract_meta(PINTEREST_PAGE, key),
+                    pinterest_bypass._extract_meta(PINTEREST_PAGE, key, meta),
+                )
+
+
+if __name__ == "__main__":
+    unittest.main()
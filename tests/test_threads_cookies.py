@@ -0,0 +1,39 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import threads_bypass  # noqa: E402
+
+COOKIES_TXT = (
+    "# Netscape HTTP Cookie File\n"
+    ".threads.net\tTRUE\t/\tTRUE\t0\tcsrftoken\tabc\n"
+    "#HttpOnly_.threads.net\tTRUE\t/\tTRUE\t0\tsessionid\tsecret\n"
+    "this line has no tabs\n"
+    "www.example.com\tTRUE\t/\tFALSE\t0\tbad_flag\tx\n"
+    "www.threads.net\tFALSE\t/\tFALSE\t0\tds_user_id\t42\n"
+)
+
+
+class LoadCookiesTest(unittest.TestCase):
+    def test_malformed_lines_are_skipped(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as f:
+            f.write(COOKIES_TXT)
+        self.addCleanup(os.remove, f.name)
+
+        cookies = threads_bypass._load_cookies(f.name)
+
+        self.assertIsNotNone(cookies)
+        self.assertEqual(
+            {cookie.name: cookie.value for cookie in cookies.jar},
+            {"csrftoken": "abc", "sessionid": "secret", "ds_user_id": "42"},
+        )
+
+    def test_missing_file(self):
+        self.assertIsNone(threads_bypass._load_cookies("/nonexistent/cookies.txt"))
+
+
+if __name__ == "__main__":
+    unittest.main()
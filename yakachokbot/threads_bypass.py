@@ -3,6 +3,19 @@ import sys
 import re
 import json
 
+# og:video (either quote style) and bare mp4 links, found in a single pass.
+# fbcdn links get their own branch, tried first, so the regex engine rather
+# than a Python loop tells CDN links apart from the rest.
+_PAGE_RE = re.compile(
+    rb'property="og:video" content="(.*?)"'
+    rb"|property='og:video' content='(.*?)'"
+    rb'|(https?://[^\s"\'\\]*fbcdn[^\s"\'\\]*\.mp4[^\s"\'\\]*)'
+    rb'|(https?://[^\s"\'\\]+\.mp4[^\s"\'\\]*)'
+)
+
+def _decode(raw):
+    return raw.decode("utf-8", "replace")
+
 def resolve_threads(url):
     try:
         # Threads/Instagram strongly prefers mobile user agents or specific impersonation
@@ -11,28 +24,45 @@ def resolve_threads(url):
         if r.status_code != 200:
             return {"error": f"HTTP {r.status_code}"}
 
+        # Undo JSON "\/" escaping once over the whole page, so links inside
+        # script data match the mp4 pattern and need no per-link cleanup
+        body = r.content.replace(b"\\/", b"/")
+        if b"og:video" not in body and b".mp4" not in body:
+            return {"error": "No video URL found in Threads page"}
+
         # Look for video in meta tags
         # <meta property="og:video" content="https://..." />
-        match = re.search(r'property="og:video" content="(.*?)"', r.text)
-        if not match:
+        og_video = single_quoted_og_video = fbcdn_link = first_link = None
+        for match in _PAGE_RE.finditer(body):
+            double_quoted, single_quoted, fbcdn_mp4, mp4_link = match.groups()
+            if double_quoted is not None:
+                og_video = double_quoted
+                break
+            if single_quoted is not None:
+                if single_quoted_og_video is None:
+                    single_quoted_og_video = single_quoted
+            elif fbcdn_mp4 is not None:
+                if fbcdn_link is None:
+                    fbcdn_link = fbcdn_mp4
+            elif first_link is None:
+                first_link = mp4_link
+
+        if og_video is None:
              # Try variant with single quotes
-             match = re.search(r"property='og:video' content='(.*?)'", r.text)
+             og_video = single_quoted_og_video
              
-        if match:
-            video_url = match.group(1).replace("&amp;", "&")
+        if og_video is not None:
+            video_url = _decode(og_video).replace("&amp;", "&")
             return {
                 "video_url": video_url,
                 "title": "Threads Video"
             }
             
         # Try searching for any mp4 links in the script data
-        mp4_links = re.findall(r'https?://[^\s"\'\\]+\.mp4[^\s"\'\\]*', r.text)
-        if mp4_links:
-             # Return the one that looks most like a CDN link (usually contains 'fbcdn')
-             for link in mp4_links:
-                 if "fbcdn" in link:
-                     return {"video_url": link.replace("\\/", "/"), "title": "Threads Video"}
-             return {"video_url": mp4_links[0].replace("\\/", "/"), "title": "Threads Video"}
+        # Return the one that looks most like a CDN link (usually contains 'fbcdn')
+        link = fbcdn_link if fbcdn_link is not None else first_link
+        if link is not None:
+            return {"video_url": _decode(link), "title": "Threads Video"}
 
         return {"error": "No video URL found in Threads page"}
 